@@ -1,67 +1,101 @@
+import time
+
 import numpy as np
-import plotly.graph_objects as go
-import random
+
+from docking import DockingWalkers, run_docking
+from instrumentation import stats
+from plotly_frames import (animation_figure, frame_indices, scatter3d_trace, thin_prefix,
+                           write_animation)
+from receptor import Receptor, energy_grid, grid_energy
+from replica_exchange import geometric_ladder, run_replica_exchange
+from rng_streams import spawn_rngs
 
 # Parameters
 RECEPTOR_POSITION = np.array([5, 5, 5])  # Center of the receptor
 BINDING_SITE = np.array([5, 6, 5])  # Specific binding pocket on the receptor
 LIGAND_START = np.array([0, 0, 0])  # Ligand's starting position
 NUM_STEPS = 100  # Total number of Monte Carlo steps
+NUM_WALKERS = 1000  # Independent ligands simulated together
+SEED = 42  # Root seed; each sampler below gets its own spawned stream
 TEMPERATURE = 1.0  # Higher temperature allows more exploration
 BINDING_RADIUS = 1.5  # Radius of "binding" pocket
+RECEPTOR_MODEL = False  # Add the interaction sites of a receptor model to the energy
+RECEPTOR_SITES = 500  # Interaction sites in the receptor shell
+GRID_SPACING = 0.1  # Receptor energy grid step (built once, cached in .energy_grids/)
+PARALLEL_TEMPERING = False  # Also sample with a replica-exchange temperature ladder
+NUM_REPLICAS = 8  # Replicas from TEMPERATURE up to MAX_TEMPERATURE
+MAX_TEMPERATURE = 10.0  # Hottest replica of the ladder
+SWAP_EVERY = 10  # Metropolis steps between swap attempts
+NUM_ROUNDS = 1000  # Swap rounds for parallel tempering
+MAX_FRAMES = 200  # Animation frames kept (steps are decimated to fit)
+ANIMATION_FILE = "docking_animation.html"  # Standalone HTML (or .json) animation
 
-# Monte Carlo Simulation
-ligand_positions = [LIGAND_START]  # Track ligand's path
-ligand_pos = LIGAND_START.copy()
-energies = []  # Store energy at each step
+# Independent random streams for the walkers, the tempering replicas and the swaps
+docking_rng, replica_rng, swap_rng = spawn_rngs(SEED, 3)
 
-def calculate_energy(ligand_pos, binding_site):
-    """Simple energy function: Lower energy when ligand is closer to the binding site."""
-    distance = np.linalg.norm(ligand_pos - binding_site)
-    return distance  # Lower distance = lower energy
+# Receptor energy: the site terms are tabulated once, so each step is a grid lookup
+energy = None  # Plain distance to the binding site
+if RECEPTOR_MODEL:
+    receptor = Receptor(RECEPTOR_POSITION, BINDING_SITE, num_sites=RECEPTOR_SITES)
+    energy = grid_energy(receptor, energy_grid(receptor, spacing=GRID_SPACING))
 
-# Perform Monte Carlo simulation
-for _ in range(NUM_STEPS):
-    # Propose a random move in 3D
-    move = np.random.uniform(-1, 1, size=3)
-    new_pos = ligand_pos + move
+# Monte Carlo Simulation: NUM_WALKERS independent ligands advanced in lockstep
+result = run_docking(
+    NUM_WALKERS,
+    NUM_STEPS,
+    LIGAND_START,
+    BINDING_SITE,
+    temperature=TEMPERATURE,
+    binding_radius=BINDING_RADIUS,
+    rng=docking_rng,
+    energy=energy,
+)
+print(result.summary())
 
-    # Calculate energies
-    old_energy = calculate_energy(ligand_pos, BINDING_SITE)
-    new_energy = calculate_energy(new_pos, BINDING_SITE)
+# Parallel tempering: replicas at geometrically spaced temperatures swap configurations
+if PARALLEL_TEMPERING:
+    ladder = geometric_ladder(TEMPERATURE, MAX_TEMPERATURE, NUM_REPLICAS)
+    replicas = DockingWalkers(NUM_REPLICAS, LIGAND_START, BINDING_SITE, BINDING_RADIUS,
+                              rng=replica_rng, energy=energy)
 
-    # Accept move based on Metropolis criterion
-    if new_energy < old_energy or random.random() < np.exp(-(new_energy - old_energy) / TEMPERATURE):
-        ligand_pos = new_pos  # Accept move
+    def advance(walkers, temperatures, steps):
+        for _ in range(steps):
+            walkers.step(temperatures)
 
-    ligand_positions.append(ligand_pos)
-    energies.append(new_energy)
+    tempering = run_replica_exchange(replicas, ladder, advance, lambda walkers: walkers.energy,
+                                     NUM_ROUNDS, SWAP_EVERY, rng=swap_rng)
+    print(tempering.summary())
 
-# Convert ligand positions to a NumPy array for plotting
-ligand_positions = np.array(ligand_positions)
+# The first walker's path and the energy of its proposed move at each step are animated
+ligand_positions = result.path
+energies = result.path_proposals
 
-# Visualization with Plotly
+# Visualization with Plotly: decimated frames, each growing path thinned to a bounded size
+render_start = time.perf_counter()
+frame_ids = frame_indices(len(ligand_positions), max_frames=MAX_FRAMES)
+energies = np.asarray(energies, dtype=np.float32)
 frames = []
-for i in range(len(ligand_positions)):
+for i in frame_ids:
     # Ligand path up to current frame
-    frame = go.Scatter3d(
-        x=ligand_positions[:i+1, 0],  # Ligand path up to current frame
-        y=ligand_positions[:i+1, 1],
-        z=ligand_positions[:i+1, 2],
+    path, _ = thin_prefix(ligand_positions, i)
+    frame = scatter3d_trace(
+        path,
+        dict(size=4, color='red'),
+        name="Ligand Path",
         mode='lines+markers',
-        marker=dict(size=4, color='red'),
         line=dict(color='red', width=2),
-        name="Ligand Path"
     )
     # Energy plot up to current frame
-    energy_frame = go.Scatter(
-        x=list(range(i+1)),
-        y=energies[:i+1],
+    energy_values, steps = thin_prefix(energies, min(i, len(energies) - 1))
+    energy_frame = dict(
+        type='scatter',
+        x=steps,
+        y=energy_values,
         mode='lines+markers',
         marker=dict(size=6, color='blue'),
         name="Energy"
     )
-    frames.append(go.Frame(data=[frame, energy_frame]))
+    frames.append(dict(name=str(i), data=[frame, energy_frame]))
 
 # Create receptor as a large sphere
 u, v = np.mgrid[0:2*np.pi:20j, 0:np.pi:10j]
@@ -70,38 +104,26 @@ y = RECEPTOR_POSITION[1] + BINDING_RADIUS * np.sin(u) * np.sin(v)
 z = RECEPTOR_POSITION[2] + BINDING_RADIUS * np.cos(v)
 
 # Base figure
-fig = go.Figure(
+fig = animation_figure(
     data=[
         # Receptor sphere
-        go.Surface(x=x, y=y, z=z, colorscale='Blues', opacity=0.5, name="Receptor"),
+        dict(type='surface', x=x, y=y, z=z, colorscale='Blues', opacity=0.5, name="Receptor"),
         # Binding pocket marker
-        go.Scatter3d(
-            x=[BINDING_SITE[0]],
-            y=[BINDING_SITE[1]],
-            z=[BINDING_SITE[2]],
-            mode='markers',
-            marker=dict(size=10, color='purple'),
-            name="Binding Pocket"
-        ),
+        scatter3d_trace(BINDING_SITE[None, :], dict(size=10, color='purple'), name="Binding Pocket"),
         # Ligand initial position
-        go.Scatter3d(
-            x=[ligand_positions[0, 0]],
-            y=[ligand_positions[0, 1]],
-            z=[ligand_positions[0, 2]],
-            mode='markers',
-            marker=dict(size=8, color='green'),
-            name="Ligand Start"
-        ),
+        scatter3d_trace(ligand_positions[:1], dict(size=8, color='green'), name="Ligand Start"),
         # Initial energy plot
-        go.Scatter(
+        dict(
+            type='scatter',
             x=[0],
-            y=[energies[0]] if energies else [0],
+            y=[float(energies[0])] if len(energies) else [0],
             mode='markers',
             marker=dict(size=6, color='blue'),
             name="Energy"
         ),
     ],
-    layout=go.Layout(
+    frames=frames,
+    layout=dict(
         title="Monte Carlo Ligand-Receptor Docking with Binding Pocket",
         scene=dict(
             xaxis=dict(range=[-5, 10]),
@@ -110,27 +132,12 @@ fig = go.Figure(
         ),
         xaxis=dict(title="Step"),
         yaxis=dict(title="Energy"),
-        updatemenus=[
-            {
-                "buttons": [
-                    {"args": [None, {"frame": {"duration": 100, "redraw": True}, "fromcurrent": True}],
-                     "label": "Play", "method": "animate"},
-                    {"args": [[None], {"frame": {"duration": 0, "redraw": True}, "mode": "immediate", "transition": {"duration": 0}}],
-                     "label": "Pause", "method": "animate"}
-                ],
-                "direction": "left",
-                "pad": {"r": 10, "t": 87},
-                "showactive": False,
-                "type": "buttons",
-                "x": 0.1,
-                "xanchor": "right",
-                "y": 0,
-                "yanchor": "top"
-            }
-        ]
     ),
-    frames=frames
+    duration=100,
 )
 
-# Show the animation
-fig.show()
+stats.add_time("docking.render.frames", time.perf_counter() - render_start)
+
+# Write the standalone animation and open it
+with stats.timer("docking.render.write"):
+    write_animation(fig, ANIMATION_FILE, auto_open=True)
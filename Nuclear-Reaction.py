@@ -1,71 +1,93 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-import random
+import sys
+
+from instrumentation import stats
+from lattice_chain import LatticeChain, metropolis_step_2d, run_chain
+from replica_exchange import geometric_ladder, run_replica_exchange
+from rng_streams import RandomBlock, spawn_rngs
 
 # Parameters
 CHAIN_LENGTH = 20  # Number of amino acids
 GRID_SIZE = 20     # Size of the grid
 STEPS = 1000       # Total Monte Carlo steps
+SNAPSHOT_EVERY = 1  # Record the chain every k steps
+SNAPSHOT_FILE = "folding_2d_snapshots.npz"  # Recorded snapshots for replay
+HEADLESS = "--headless" in sys.argv  # Run without drawing anything
+REPLAY = "--replay" in sys.argv  # Animate SNAPSHOT_FILE instead of simulating
+TEMPERING = "--tempering" in sys.argv  # Report a parallel-tempering run instead
+NUM_REPLICAS = 8   # Replicas from T = 1 up to MAX_TEMPERATURE
+MAX_TEMPERATURE = 5.0  # Hottest replica of the ladder
+SWAP_EVERY = 10    # Monte Carlo steps between swap attempts
+SEED = 42          # Root seed; every chain / replica gets its own spawned stream
 
 # Initialize protein chain as a line in the grid
-protein_chain = [(i, GRID_SIZE // 2) for i in range(CHAIN_LENGTH)]
+protein_chain = LatticeChain([(i, GRID_SIZE // 2) for i in range(CHAIN_LENGTH)], grid_size=GRID_SIZE)
+
+# Energy: number of overlaps (simplified), tracked incrementally by LatticeChain
+
+# Pre-generated random numbers for the single-chain run (replicas spawn their own)
+RANDOM = RandomBlock(SEED)
+
+# Monte Carlo step: a random up/down/left/right move of one monomer (see lattice_chain)
+def monte_carlo_step(chain, temperature=1.0, rng=None):
+    return metropolis_step_2d(chain, RANDOM if rng is None else rng, temperature)
+
+# Replay recorded snapshots as an animation (optional; needs matplotlib and a display)
+def replay(snapshots, energies):
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+
+    fig, ax = plt.subplots(figsize=(6, 6))
+    ax.set_xlim(0, GRID_SIZE)
+    ax.set_ylim(0, GRID_SIZE)
+    ax.set_xticks([])
+    ax.set_yticks([])
+
+    protein_plot, = ax.plot([], [], "bo-", lw=2)  # Protein chain
+    energy_text = ax.text(0.05, 0.95, "", transform=ax.transAxes, fontsize=12, va="top")
 
-# Energy function: Penalize overlaps (simplified)
-def calculate_energy(chain):
-    unique_positions = len(set(chain))
-    return CHAIN_LENGTH - unique_positions  # Energy increases with overlaps
+    # Animation update function
+    def update(frame):
+        # Update protein chain plot
+        protein_plot.set_data(snapshots[frame, :, 0], snapshots[frame, :, 1])
+        
+        # Update energy text
+        energy_text.set_text(f"Energy: {energies[frame]}")
+        return protein_plot, energy_text
 
-# Monte Carlo step
-def monte_carlo_step(chain):
-    # Select a random amino acid (not the first or last)
-    index = random.randint(1, len(chain) - 2)
-    
-    # Random move: Up, down, left, right
-    moves = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-    dx, dy = random.choice(moves)
-    new_position = (chain[index][0] + dx, chain[index][1] + dy)
-    
-    # Create a new chain with the move
-    new_chain = chain[:]
-    new_chain[index] = new_position
-    
-    # Apply periodic boundary conditions
-    new_chain[index] = (new_chain[index][0] % GRID_SIZE, new_chain[index][1] % GRID_SIZE)
-    
-    # Calculate energy difference
-    old_energy = calculate_energy(chain)
-    new_energy = calculate_energy(new_chain)
-    
-    # Accept move with Metropolis criterion
-    if new_energy <= old_energy or random.random() < np.exp(-(new_energy - old_energy)):
-        return new_chain  # Accept move
-    return chain  # Reject move
+    # Run animation
+    ani = FuncAnimation(fig, update, frames=len(snapshots), blit=True, interval=50, repeat=False)
+    plt.title("Protein Folding Simulation")
+    plt.show()
 
-# Visualization
-fig, ax = plt.subplots(figsize=(6, 6))
-ax.set_xlim(0, GRID_SIZE)
-ax.set_ylim(0, GRID_SIZE)
-ax.set_xticks([])
-ax.set_yticks([])
+if REPLAY:
+    recorded = np.load(SNAPSHOT_FILE)
+    replay(recorded["snapshots"], recorded["energies"])
+elif TEMPERING:
+    # Replicas on a temperature ladder, each advanced with monte_carlo_step at its own T
+    replicas = [LatticeChain([(i, GRID_SIZE // 2) for i in range(CHAIN_LENGTH)], grid_size=GRID_SIZE)
+                for _ in range(NUM_REPLICAS)]
 
-protein_plot, = ax.plot([], [], "bo-", lw=2)  # Protein chain
-energy_text = ax.text(0.05, 0.95, "", transform=ax.transAxes, fontsize=12, va="top")
+    # Independent streams: one per replica, one for the swap decisions
+    *replica_rngs, swap_rng = spawn_rngs(SEED, NUM_REPLICAS + 1)
+    replica_random = [RandomBlock(rng) for rng in replica_rngs]
 
-# Animation update function
-def update(frame):
-    global protein_chain
-    protein_chain = monte_carlo_step(protein_chain)
-    
-    # Update protein chain plot
-    x_coords, y_coords = zip(*protein_chain)
-    protein_plot.set_data(x_coords, y_coords)
-    
-    # Update energy text
-    energy_text.set_text(f"Energy: {calculate_energy(protein_chain)}")
-    return protein_plot, energy_text
+    def advance(chains, temperatures, steps):
+        for chain, temperature, rng in zip(chains, temperatures, replica_random):
+            for _ in range(steps):
+                monte_carlo_step(chain, temperature, rng)
 
-# Run animation
-ani = FuncAnimation(fig, update, frames=STEPS, blit=True, interval=50, repeat=False)
-plt.title("Protein Folding Simulation")
-plt.show()
+    tempering = run_replica_exchange(replicas, geometric_ladder(1.0, MAX_TEMPERATURE, NUM_REPLICAS),
+                                     advance, lambda chains: [chain.energy for chain in chains],
+                                     STEPS // SWAP_EVERY, SWAP_EVERY, rng=swap_rng)
+    stats.count("folding.move.proposed", NUM_REPLICAS * len(tempering.cold_energies) * SWAP_EVERY)
+    stats.count("folding.move.accepted", sum(chain.moves for chain in replicas))
+    print(tempering.summary())
+else:
+    # Run all steps at full speed, recording a snapshot every SNAPSHOT_EVERY steps
+    snapshots, energies = run_chain(protein_chain, monte_carlo_step, STEPS, SNAPSHOT_EVERY)
+    np.savez_compressed(SNAPSHOT_FILE, snapshots=snapshots, energies=energies)
+    if HEADLESS:
+        print(f"{STEPS} steps, final energy {energies[-1]}, snapshots saved to {SNAPSHOT_FILE}")
+    else:
+        replay(snapshots, energies)
@@ -1,6 +1,8 @@
-import numpy as np
-import matplotlib.pyplot as plt
-import random
+import sys
+
+from checkpoint import Checkpointer
+from neutron_transport import criticality, transport
+from rng_streams import make_rng
 
 # Constants
 MEDIUM_SIZE = 10  # Size of the medium (10x10 units)
@@ -9,73 +11,74 @@ MEAN_FREE_PATH = 1.0  # Average distance between interactions
 SCATTER_PROB = 0.6  # Probability of scattering
 ABSORPTION_PROB = 0.3  # Probability of absorption
 FISSION_PROB = 0.1  # Probability of fission (should sum to 1 with others)
+MESH_BINS = 50  # Tally mesh cells per side
+TRACK_FRACTION = 0.05  # Fraction of neutron histories whose tracks are drawn
+MAX_TRACK_SEGMENTS = 2000  # Cap on drawn flight segments
+SEED = 42  # For reproducibility (None draws fresh entropy)
 
-# Initialize neutron positions and tracks
-neutron_tracks = []  # Tracks for visualization
-absorbed_positions = []  # Positions of absorbed neutrons
-fission_positions = []  # Positions of fission events
-
-def random_direction():
-    """Generate a random direction in 2D (angle in radians)."""
-    angle = random.uniform(0, 2 * np.pi)
-    return np.cos(angle), np.sin(angle)
-
-def simulate_neutron():
-    """Simulate the path of a single neutron."""
-    # Start neutron at random position
-    x, y = random.uniform(0, MEDIUM_SIZE), random.uniform(0, MEDIUM_SIZE)
-    neutron_path = [(x, y)]  # Store neutron's path
-
-    while 0 <= x <= MEDIUM_SIZE and 0 <= y <= MEDIUM_SIZE:
-        # Sample distance to next interaction
-        distance = np.random.exponential(MEAN_FREE_PATH)
-        dx, dy = random_direction()
-        x += dx * distance
-        y += dy * distance
-        neutron_path.append((x, y))
-
-        # Determine interaction type
-        interaction = np.random.choice(
-            ["scatter", "absorb", "fission"],
-            p=[SCATTER_PROB, ABSORPTION_PROB, FISSION_PROB]
-        )
-
-        if interaction == "absorb":
-            absorbed_positions.append((x, y))
-            break
-        elif interaction == "fission":
-            fission_positions.append((x, y))
-            # Spawn two new neutrons (fission event)
-            simulate_neutron()
-            simulate_neutron()
-            break
-        # If scattering, neutron continues with a new random direction
+# k-eigenvalue (criticality) mode
+CRITICALITY = "--criticality" in sys.argv  # Power iteration instead of a single transport run
+NEUTRONS_PER_GENERATION = 10000  # Constant source population per generation
+NEUTRONS_PER_FISSION = 2  # Neutrons released by each fission
+INACTIVE_GENERATIONS = 10  # Generations discarded while the fission source converges
+MAX_ACTIVE_GENERATIONS = 200  # Upper bound on tallied generations
+K_TOLERANCE = 0.002  # Stop once the 95% confidence half-width of k-eff is below this
 
-    neutron_tracks.append(neutron_path)
+# Checkpoint/restart for long runs
+CHECKPOINT_FILE = "nut_sim_checkpoint.npz"  # Written atomically between batches / generations
+CHECKPOINT_INTERVAL = 300  # Seconds between checkpoints
+RESTART = "--restart" in sys.argv  # Continue from CHECKPOINT_FILE instead of starting over
 
-# Simulate all neutrons
-for _ in range(NUM_NEUTRONS):
-    simulate_neutron()
+def plot_transport(result):
+    """Render the mesh tallies as images, with the sampled tracks over the flux."""
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
 
-# Visualization
-plt.figure(figsize=(8, 8))
-plt.xlim(0, MEDIUM_SIZE)
-plt.ylim(0, MEDIUM_SIZE)
-plt.title("Neutron Transport Simulation")
+    # Visualization
+    fig, axes = plt.subplots(1, 3, figsize=(18, 6))
+    fig.suptitle("Neutron Transport Simulation")
+    extent = (0, MEDIUM_SIZE, 0, MEDIUM_SIZE)
+    panels = [
+        (result.mesh.flux, "Scalar flux", "viridis"),
+        (result.mesh.absorption, "Absorption density", "Reds"),
+        (result.mesh.fission, "Fission density", "Blues"),
+    ]
+    for ax, (tally, title, cmap) in zip(axes, panels):
+        image = ax.imshow(result.mesh.density(tally, per=NUM_NEUTRONS), origin="lower",
+                          extent=extent, cmap=cmap)
+        fig.colorbar(image, ax=ax, shrink=0.8, label="per source neutron per unit area")
+        ax.set_title(title)
+        ax.set_xlabel("X Position")
+        ax.set_ylabel("Y Position")
 
-# Plot neutron tracks
-for path in neutron_tracks:
-    x_coords, y_coords = zip(*path)
-    plt.plot(x_coords, y_coords, linewidth=0.5, alpha=0.7)
+    # Sampled neutron tracks as one collection of flight segments
+    tracks = LineCollection(result.tracks.reshape(-1, 2, 2), linewidths=0.5, alpha=0.5,
+                            colors="white")
+    axes[0].add_collection(tracks)
+    axes[0].set_xlim(0, MEDIUM_SIZE)
+    axes[0].set_ylim(0, MEDIUM_SIZE)
+    plt.show()
 
-# Plot absorbed and fission events
-absorbed_x, absorbed_y = zip(*absorbed_positions) if absorbed_positions else ([], [])
-fission_x, fission_y = zip(*fission_positions) if fission_positions else ([], [])
-plt.scatter(absorbed_x, absorbed_y, color="red", label="Absorbed", s=10)
-plt.scatter(fission_x, fission_y, color="blue", label="Fission", s=10)
+def report_generation(generation, k, result):
+    """Print each generation's k and, once tallying, the running estimate."""
+    line = f"generation {generation + 1:4d}: k = {k:.5f}"
+    if generation >= INACTIVE_GENERATIONS:
+        line += f"   running k-eff = {result.k_mean:.5f} +/- {result.ci_half_width:.5f}"
+    print(line)
 
-plt.legend()
-plt.xlabel("X Position")
-plt.ylabel("Y Position")
-plt.grid()
-plt.show()
+checkpoint = Checkpointer(CHECKPOINT_FILE, CHECKPOINT_INTERVAL)
+if CRITICALITY:
+    keff = criticality(NEUTRONS_PER_GENERATION, MEDIUM_SIZE, MEAN_FREE_PATH, SCATTER_PROB,
+                       ABSORPTION_PROB, FISSION_PROB, nu=NEUTRONS_PER_FISSION,
+                       inactive=INACTIVE_GENERATIONS, max_active=MAX_ACTIVE_GENERATIONS,
+                       tolerance=K_TOLERANCE, callback=report_generation,
+                       rng=make_rng(SEED), checkpoint=checkpoint, restart=RESTART)
+    print(keff.summary())
+else:
+    # Simulate all neutrons: event-based transport over a NumPy particle bank
+    result = transport(NUM_NEUTRONS, MEDIUM_SIZE, MEAN_FREE_PATH, SCATTER_PROB, ABSORPTION_PROB,
+                       FISSION_PROB, mesh_bins=MESH_BINS, track_fraction=TRACK_FRACTION,
+                       max_track_segments=MAX_TRACK_SEGMENTS, rng=make_rng(SEED),
+                       checkpoint=checkpoint, restart=RESTART)
+    print(result.summary())
+    plot_transport(result)
@@ -1,18 +1,26 @@
+import queue
 import tkinter as tk
 from tkinter import ttk
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import random
+import numpy as np
+
+from pi_estimation import SAMPLING_METHODS, PiEstimator, SamplingWorker
+
+POLL_INTERVAL = 50  # Milliseconds between progress-queue polls
 
 class MonteCarloApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Monte Carlo Simulation - Estimate π")
         
-        # Parameters for simulation
-        self.total_points = 0
-        self.inside_circle = 0
-        self.points = []
+        # Running counts and a fixed-size sample of points for plotting
+        self.estimator = PiEstimator()
+        
+        # Background sampling; the worker posts progress to this queue
+        self.worker = None
+        self.progress = queue.Queue()
+        self.poll_id = None
         
         # Setting up GUI layout
         self.setup_gui()
@@ -27,10 +35,23 @@ class MonteCarloApp:
         self.num_points_entry = ttk.Entry(control_frame)
         self.num_points_entry.pack(pady=5)
         
+        # Sampling method (changing it resets the estimate)
+        tk.Label(control_frame, text="Sampling Method:").pack(pady=5)
+        self.method_var = tk.StringVar(value=self.estimator.method)
+        self.method_box = ttk.Combobox(control_frame, textvariable=self.method_var,
+                                       values=SAMPLING_METHODS, state="readonly")
+        self.method_box.bind("<<ComboboxSelected>>", self.change_method)
+        self.method_box.pack(pady=5)
+        
         # Start button
         self.start_button = ttk.Button(control_frame, text="Start Simulation", command=self.start_simulation)
         self.start_button.pack(pady=10)
         
+        # Cancel button
+        self.cancel_button = ttk.Button(control_frame, text="Cancel", command=self.cancel_simulation,
+                                        state=tk.DISABLED)
+        self.cancel_button.pack(pady=5)
+        
         # Reset button
         self.reset_button = ttk.Button(control_frame, text="Reset", command=self.reset_simulation)
         self.reset_button.pack(pady=5)
@@ -39,12 +60,19 @@ class MonteCarloApp:
         self.result_label = tk.Label(control_frame, text="Estimated π: N/A", font=("Arial", 14))
         self.result_label.pack(pady=10)
         
+        # Progress of the current run and sampling throughput
+        self.progress_bar = ttk.Progressbar(control_frame, length=200, maximum=1.0)
+        self.progress_bar.pack(pady=5)
+        self.status_label = tk.Label(control_frame, text="Idle")
+        self.status_label.pack(pady=5)
+        
         # Matplotlib figure
         self.fig, self.ax = plt.subplots(figsize=(6, 6))
         self.ax.set_xlim(-1, 1)
         self.ax.set_ylim(-1, 1)
         self.ax.set_aspect('equal')
         self.ax.add_patch(plt.Circle((0, 0), 1, color='blue', fill=False))
+        self.scatter = self.ax.scatter([], [], s=4)
         
         # Embed Matplotlib figure into Tkinter
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.root)
@@ -58,46 +86,86 @@ class MonteCarloApp:
             self.result_label.config(text="Please enter a valid number.")
             return
         
-        self.total_points += num_points
-        
-        for _ in range(num_points):
-            x, y = random.uniform(-1, 1), random.uniform(-1, 1)
-            self.points.append((x, y))
-            if x**2 + y**2 <= 1:
-                self.inside_circle += 1
-        
-        self.update_plot()
-        self.update_result()
-        
-    def update_plot(self):
-        self.ax.clear()
-        self.ax.set_xlim(-1, 1)
-        self.ax.set_ylim(-1, 1)
-        self.ax.set_aspect('equal')
-        self.ax.add_patch(plt.Circle((0, 0), 1, color='blue', fill=False))
-        
-        # Plot points
-        for x, y in self.points:
-            color = 'green' if x**2 + y**2 <= 1 else 'red'
-            self.ax.plot(x, y, marker='o', markersize=2, color=color)
+        if num_points <= 0:
+            self.result_label.config(text="Please enter a positive number.")
+            return
         
+        # Sample on a background thread; poll_progress picks up its reports
+        self.worker = SamplingWorker(self.estimator, num_points, self.progress)
+        self.worker.start()
+        self.start_button.config(state=tk.DISABLED)
+        self.method_box.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.status_label.config(text="Running...")
+        self.poll_id = self.root.after(POLL_INTERVAL, self.poll_progress)
+        
+    def poll_progress(self):
+        # Only the latest report matters; drain the queue
+        latest = None
+        while True:
+            try:
+                latest = self.progress.get_nowait()
+            except queue.Empty:
+                break
+        if latest is not None:
+            self.update_plot(latest.points)
+            self.update_result(latest)
+            if latest.finished:
+                self.finish_run()
+                return
+        self.poll_id = self.root.after(POLL_INTERVAL, self.poll_progress)
+        
+    def finish_run(self):
+        if self.poll_id is not None:
+            self.root.after_cancel(self.poll_id)
+            self.poll_id = None
+        self.worker = None
+        self.start_button.config(state=tk.NORMAL)
+        self.method_box.config(state="readonly")
+        self.cancel_button.config(state=tk.DISABLED)
+        
+    def change_method(self, event=None):
+        self.reset_simulation()
+        self.estimator = PiEstimator(method=self.method_var.get())
+        
+    def cancel_simulation(self):
+        # The worker stops after its current chunk and posts a final report
+        if self.worker is not None:
+            self.worker.cancel()
+            self.cancel_button.config(state=tk.DISABLED)
+        
+    def update_plot(self, points):
+        # Plot the reservoir sample as a single collection
+        inside = np.einsum("ij,ij->i", points, points) <= 1
+        self.scatter.set_offsets(points)
+        self.scatter.set_color(np.where(inside, 'green', 'red'))
         self.canvas.draw()
         
-    def update_result(self):
-        if self.total_points > 0:
-            estimated_pi = 4 * (self.inside_circle / self.total_points)
-            self.result_label.config(text=f"Estimated π: {estimated_pi:.6f}")
+    def update_result(self, progress):
+        if progress.total > 0:
+            self.result_label.config(
+                text=f"Estimated π: {progress.estimate:.6f}\n± {progress.std_error:.6f} (1σ)")
+        self.progress_bar.config(value=progress.done / progress.requested)
+        if not progress.finished:
+            state = "Running"
+        else:
+            state = "Done" if progress.done == progress.requested else "Cancelled"
+        self.status_label.config(
+            text=f"{state}: {progress.total:,} points\n{progress.samples_per_second / 1e6:.1f}M samples/s")
         
     def reset_simulation(self):
-        self.total_points = 0
-        self.inside_circle = 0
-        self.points = []
-        self.ax.clear()
-        self.ax.set_xlim(-1, 1)
-        self.ax.set_ylim(-1, 1)
-        self.ax.set_aspect('equal')
-        self.ax.add_patch(plt.Circle((0, 0), 1, color='blue', fill=False))
+        # Stop a run in progress before clearing its estimator
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.join()
+            self.finish_run()
+        while not self.progress.empty():
+            self.progress.get_nowait()
+        self.estimator.reset()
+        self.scatter.set_offsets(np.empty((0, 2)))
         self.result_label.config(text="Estimated π: N/A")
+        self.progress_bar.config(value=0)
+        self.status_label.config(text="Idle")
         self.canvas.draw()
 
 # Run the application
@@ -1,95 +1,10 @@
-import numpy as np
-import plotly.graph_objects as go
+"""Galaxy formation coloured by height (see `python -m galaxy --help`).
 
-# Parameters
-NUM_PARTICLES = 200  # Number of stars
-G = 1  # Gravitational constant (scaled for visualization)
-TIME_STEP = 0.01  # Time step for integration
-NUM_STEPS = 500  # Number of simulation steps
-SOFTENING = 0.1  # To prevent singularities in the gravitational force
+Extra command-line options are passed through, e.g. `python astro0.py --steps 100`.
+"""
+import sys
 
-# Initialize particle positions, velocities, and masses
-np.random.seed(42)  # For reproducibility
-positions = np.random.uniform(-5, 5, (NUM_PARTICLES, 3))  # Random 3D positions
-velocities = np.random.uniform(-0.5, 0.5, (NUM_PARTICLES, 3))  # Random velocities
-masses = np.random.uniform(0.5, 1.5, NUM_PARTICLES)  # Random masses
+from galaxy.cli import main
 
-# Store positions for plotting
-positions_over_time = [positions.copy()]
-
-# Function to calculate gravitational forces
-def compute_gravitational_force(pos, masses):
-    """Compute gravitational forces for all particles."""
-    force = np.zeros_like(pos)  # Shape (200, 3) to store forces
-    for i in range(len(pos)):
-        diff = pos - pos[i]  # Shape (200, 3)
-        distance = np.linalg.norm(diff, axis=1) + SOFTENING  # Shape (200,)
-        # Compute gravitational force
-        force[i] = np.sum(G * masses[i] * masses[:, None] * diff / distance[:, None]**3, axis=0)
-    return force
-
-# Simulation loop
-for _ in range(NUM_STEPS):
-    forces = compute_gravitational_force(positions, masses)
-    velocities += forces * TIME_STEP / masses[:, None]  # Update velocities
-    positions += velocities * TIME_STEP  # Update positions
-    positions_over_time.append(positions.copy())  # Save positions
-
-# Convert to NumPy array for visualization
-positions_over_time = np.array(positions_over_time)
-
-# Visualization with Plotly
-frames = []
-for i in range(len(positions_over_time)):
-    frame = go.Scatter3d(
-        x=positions_over_time[i, :, 0],
-        y=positions_over_time[i, :, 1],
-        z=positions_over_time[i, :, 2],
-        mode='markers',
-        marker=dict(size=3, color=positions_over_time[i, :, 2], colorscale='Viridis'),
-        name="Stars"
-    )
-    frames.append(go.Frame(data=[frame]))
-
-# Create the base figure
-fig = go.Figure(
-    data=[
-        go.Scatter3d(
-            x=positions_over_time[0, :, 0],
-            y=positions_over_time[0, :, 1],
-            z=positions_over_time[0, :, 2],
-            mode='markers',
-            marker=dict(size=3, color=positions_over_time[0, :, 2], colorscale='Viridis'),
-        )
-    ],
-    layout=go.Layout(
-        title="Galaxy Formation Simulation",
-        scene=dict(
-            xaxis=dict(range=[-10, 10]),
-            yaxis=dict(range=[-10, 10]),
-            zaxis=dict(range=[-10, 10]),
-        ),
-        updatemenus=[
-            {
-                "buttons": [
-                    {"args": [None, {"frame": {"duration": 50, "redraw": True}, "fromcurrent": True}],
-                     "label": "Play", "method": "animate"},
-                    {"args": [[None], {"frame": {"duration": 0, "redraw": True}, "mode": "immediate", "transition": {"duration": 0}}],
-                     "label": "Pause", "method": "animate"}
-                ],
-                "direction": "left",
-                "pad": {"r": 10, "t": 87},
-                "showactive": False,
-                "type": "buttons",
-                "x": 0.1,
-                "xanchor": "right",
-                "y": 0,
-                "yanchor": "top"
-            }
-        ]
-    ),
-    frames=frames
-)
-
-# Show the animation
-fig.show()
+if __name__ == "__main__":
+    main(["--render", "height", *sys.argv[1:]])
@@ -0,0 +1 @@
+"""Headless performance reports; run each one with `python -m benchmarks.<name>`."""
@@ -0,0 +1,21 @@
+"""Accuracy vs. speed of the Barnes-Hut backend against the direct sum."""
+import argparse
+
+from galaxy.barnes_hut import accuracy_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 4000])
+    parser.add_argument("--thetas", type=float, nargs="+", default=[0.3, 0.5, 0.7, 1.0])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'N':>7} {'theta':>6} {'direct s':>9} {'BH s':>8} {'speedup':>8} {'median err':>11} {'max err':>9}")
+    for row in accuracy_report(args.sizes, args.thetas, args.seed):
+        print(f"{row['N']:>7} {row['theta']:>6.2f} {row['direct_s']:>9.3f} {row['barnes_hut_s']:>8.3f} "
+              f"{row['speedup']:>8.2f} {row['median_rel_error']:>11.2e} {row['max_rel_error']:>9.2e}")
+
+
+if __name__ == "__main__":
+    main()
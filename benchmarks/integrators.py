@@ -0,0 +1,25 @@
+"""Energy drift against force evaluations for the galaxy integrators."""
+import argparse
+
+from galaxy.integrators import INTEGRATORS, integrator_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--particles", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=2.0)
+    parser.add_argument("--steps", type=int, nargs="+", default=[50, 100, 200, 400])
+    parser.add_argument("--integrators", nargs="+", choices=INTEGRATORS, default=INTEGRATORS)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'integrator':>10} {'steps':>6} {'max drift':>10} {'final drift':>11} "
+          f"{'force evals':>11} {'seconds':>8}")
+    for row in integrator_report(args.particles, args.duration, args.steps, args.integrators,
+                                 args.seed):
+        print(f"{row['integrator']:>10} {row['steps']:>6} {row['max_drift']:>10.2e} "
+              f"{row['final_drift']:>11.2e} {row['force_evaluations']:>11} {row['seconds']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Strong scaling of the parallel direct-sum kernel against the serial one, 1 to N workers."""
+import argparse
+import os
+
+from galaxy.parallel import scaling_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--particles", type=int, default=4000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--steps", type=int, default=3)
+    parser.add_argument("--mode", choices=["process", "thread"], default="process")
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'s/step':>8} {'speedup':>8} {'efficiency':>10} {'max diff':>9}")
+    for row in scaling_report(args.particles, args.max_workers, args.steps, args.mode):
+        print(f"{row['workers']:>7} {row['seconds_per_step']:>8.3f} {row['speedup']:>8.2f} "
+              f"{row['efficiency']:>10.2f} {row['max_difference']:>9.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Error against samples and wall time for each pi sampling method."""
+import argparse
+
+from pi_estimation import SAMPLING_METHODS, cost_to_accuracy, variance_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--methods", nargs="+", choices=SAMPLING_METHODS, default=SAMPLING_METHODS)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--target", type=float, default=1e-5, help="RMS error to reach")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = variance_report(args.sizes, args.methods, args.repeats, args.seed)
+    print(f"{'method':>10} {'samples':>10} {'rms error':>10} {'seconds':>9}")
+    for row in rows:
+        print(f"{row['method']:>10} {row['samples']:>10} {row['rms_error']:>10.2e} "
+              f"{row['seconds']:>9.4f}")
+
+    print(f"\nCost to reach an RMS error of {args.target:g} (fitted, may extrapolate):")
+    print(f"{'method':>10} {'exponent':>8} {'samples':>10} {'seconds':>9}")
+    for method, cost in cost_to_accuracy(rows, args.target).items():
+        print(f"{method:>10} {cost['error_exponent']:>8.2f} {cost['samples']:>10.3g} "
+              f"{cost['seconds']:>9.3g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Energy drift, run time and trajectory size of the galaxy run per precision."""
+import argparse
+
+from galaxy.integrators import INTEGRATORS
+from galaxy.simulation import PRECISIONS, precision_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--particles", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--dt", type=float, default=0.01)
+    parser.add_argument("--integrator", choices=INTEGRATORS, default="leapfrog")
+    parser.add_argument("--precisions", nargs="+", choices=list(PRECISIONS),
+                        default=list(PRECISIONS))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'particles':>9} {'precision':>9} {'energy drift':>12} {'position err':>12} "
+          f"{'seconds':>8} {'trajectory MB':>13}")
+    for particles in args.particles:
+        for row in precision_report(particles, args.steps, args.integrator, args.dt,
+                                    args.precisions, args.seed):
+            print(f"{particles:>9} {row['precision']:>9} {row['energy_drift']:>12.2e} "
+                  f"{row['position_error']:>12.2e} {row['seconds']:>8.2f} "
+                  f"{row['trajectory_bytes'] / 1e6:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Benchmark every simulation kernel over several problem sizes.
+
+Each kernel is timed at each size (best of `--repeats` batches), and its
+peak traced memory is measured in a separate run, so tracing does not
+distort the timings. Results go to a JSON file. With `--baseline`, they
+are compared against a stored results file, and any kernel that slowed
+down by more than `--tolerance` is flagged (the exit status is then 1).
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --quick --baseline results.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from docking import run_docking
+from galaxy.barnes_hut import BarnesHutForce
+from galaxy.forces import DirectSumForce
+from haber_kinetics import simulate_ssa
+from lattice_chain import LatticeChain, metropolis_step_2d, metropolis_step_3d
+from neutron_transport import transport
+from pi_estimation import PiEstimator
+from rng_streams import RandomBlock, make_rng
+
+MIN_SECONDS = 0.2  # Minimum wall time of one timed batch
+SEED = 42
+
+
+def _direct_sum(size):
+    rng = make_rng(SEED)
+    pos, masses = rng.uniform(-5, 5, (size, 3)), rng.uniform(0.5, 1.5, size)
+    kernel = DirectSumForce()
+    force = np.empty_like(pos)
+    return lambda: kernel(pos, masses, out=force)
+
+
+def _barnes_hut(size):
+    rng = make_rng(SEED)
+    pos, masses = rng.uniform(-5, 5, (size, 3)), rng.uniform(0.5, 1.5, size)
+    kernel = BarnesHutForce()
+    force = np.empty_like(pos)
+    return lambda: kernel(pos, masses, out=force)
+
+
+def _folding(size):
+    """1000 Metropolis moves of the 2D folding script (Nuclear-Reaction.py) on a chain of `size`."""
+    chain = LatticeChain([(i, 0) for i in range(size)], grid_size=max(size, 20))
+    rng = RandomBlock(SEED)
+
+    def run():
+        for _ in range(1000):
+            metropolis_step_2d(chain, rng)
+    return run
+
+
+def _folding_3d(size):
+    """1000 Metropolis moves of the 3D folding script (protein folding.py) on a chain of `size`."""
+    chain = LatticeChain([(i, 0, 0) for i in range(size)])
+    rng = RandomBlock(SEED)
+
+    def run():
+        for _ in range(1000):
+            metropolis_step_3d(chain, rng)
+    return run
+
+
+def _transport(size):
+    rng = make_rng(SEED)
+    return lambda: transport(size, 10, 1.0, 0.6, 0.3, 0.1, rng=rng)
+
+
+def _pi(size):
+    estimator = PiEstimator(rng=make_rng(SEED))
+    return lambda: estimator.sample(size)
+
+
+def _docking(size):
+    rng = make_rng(SEED)
+    return lambda: run_docking(size, 100, np.zeros(3), np.array([5.0, 6.0, 5.0]), rng=rng)
+
+
+def _haber(size):
+    rng = make_rng(SEED)
+    k_forward = 0.05 / (50 * 150 * 149 * 148 / 6)
+    return lambda: simulate_ssa((50, 150, 0), k_forward, 1e-4, 200, 201, size, rng)
+
+
+# name -> (setup(size) returning a no-argument callable, unit, sizes, quick sizes)
+KERNELS = {
+    "direct_sum": (_direct_sum, "force evaluations", (500, 1000, 2000, 4000), (250, 500)),
+    "barnes_hut": (_barnes_hut, "force evaluations", (1000, 4000, 16000), (1000, 2000)),
+    "folding": (_folding, "1000 moves", (20, 100, 500), (20, 100)),
+    "folding_3d": (_folding_3d, "1000 moves", (15, 100, 500), (15, 100)),
+    "transport": (_transport, "runs", (10_000, 100_000, 1_000_000), (10_000, 50_000)),
+    "pi": (_pi, "batches", (100_000, 1_000_000, 10_000_000), (100_000, 1_000_000)),
+    "docking": (_docking, "100-step runs", (100, 1000, 10_000), (100, 1000)),
+    "haber_ssa": (_haber, "runs", (100, 1000, 10_000), (100, 1000)),
+}
+
+
+def time_call(run, repeats=3, min_seconds=MIN_SECONDS):
+    """Best seconds per call over `repeats` batches of at least `min_seconds`."""
+    run()  # Warm-up
+    start = time.perf_counter()
+    run()
+    once = time.perf_counter() - start
+    calls = max(1, int(min_seconds / once)) if once > 0 else 1000
+    best = once
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            run()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def peak_memory(setup, size):
+    """Peak traced memory, in bytes, of setting up and calling a kernel once."""
+    tracemalloc.start()
+    try:
+        setup(size)()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_suite(kernels=None, quick=False, repeats=3):
+    """Benchmark the named kernels (all by default); returns the results dict."""
+    rows = []
+    for name in kernels or KERNELS:
+        setup, unit, sizes, quick_sizes = KERNELS[name]
+        for size in quick_sizes if quick else sizes:
+            seconds = time_call(setup(size), repeats)
+            rows.append({
+                "kernel": name,
+                "size": size,
+                "unit": unit,
+                "seconds": seconds,
+                "per_second": 1 / seconds,
+                "peak_bytes": peak_memory(setup, size),
+            })
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": rows,
+    }
+
+
+def scaling_exponents(results):
+    """Log-log slope of seconds against size per kernel (1 = linear)."""
+    exponents = {}
+    for name in dict.fromkeys(row["kernel"] for row in results["results"]):
+        rows = [row for row in results["results"] if row["kernel"] == name]
+        if len(rows) > 1:
+            exponents[name] = float(np.polyfit(np.log([row["size"] for row in rows]),
+                                               np.log([row["seconds"] for row in rows]), 1)[0])
+    return exponents
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Rows present in both runs, with their slowdown and a regression flag."""
+    reference = {(row["kernel"], row["size"]): row for row in baseline["results"]}
+    rows = []
+    for row in results["results"]:
+        old = reference.get((row["kernel"], row["size"]))
+        if old is None:
+            continue
+        ratio = row["seconds"] / old["seconds"]
+        rows.append({
+            "kernel": row["kernel"],
+            "size": row["size"],
+            "ratio": ratio,
+            "memory_ratio": row["peak_bytes"] / max(old["peak_bytes"], 1),
+            "regression": ratio > 1 + tolerance,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kernels", nargs="+", choices=list(KERNELS), default=list(KERNELS))
+    parser.add_argument("--quick", action="store_true", help="small sizes only")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown before flagging a regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = run_suite(args.kernels, args.quick, args.repeats)
+    with open(args.output, "w") as handle:
+        json.dump(results, handle, indent=2)
+
+    print(f"{'kernel':>11} {'size':>9} {'s/call':>10} {'calls/s':>10} {'peak MB':>8}  unit")
+    for row in results["results"]:
+        print(f"{row['kernel']:>11} {row['size']:>9} {row['seconds']:>10.2e} "
+              f"{row['per_second']:>10.3g} {row['peak_bytes'] / 1e6:>8.1f}  {row['unit']}")
+    print("\nScaling exponents (seconds ~ size**k): " + ", ".join(
+        f"{name} {k:.2f}" for name, k in scaling_exponents(results).items()))
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            rows = compare(results, json.load(handle), args.tolerance)
+        regressions = [row for row in rows if row["regression"]]
+        print(f"\nAgainst {args.baseline} ({len(rows)} matching rows):")
+        for row in rows:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['kernel']:>11} {row['size']:>9} time x{row['ratio']:.2f} "
+                  f"memory x{row['memory_ratio']:.2f}{flag}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
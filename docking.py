@@ -0,0 +1,155 @@
+"""Batched Monte Carlo ligand docking: many independent walkers in lockstep.
+
+Each walker is one copy of the Drug-Discovery.py ligand. All walkers are
+advanced together as (M, 3) arrays: one vectorised proposal, one vectorised
+energy evaluation and one vectorised Metropolis test per step, so the cost
+per walker-step is a few array operations instead of several Python calls.
+The energy defaults to the script's distance to the binding site; any
+vectorised `energy(positions)` can be passed instead, such as the grid
+lookup of `receptor.grid_energy`.
+"""
+import time
+
+import numpy as np
+
+from instrumentation import stats
+
+
+def calculate_energy(ligand_pos, binding_site):
+    """Simple energy function: distance to the binding site, for any (..., 3) array."""
+    diff = ligand_pos - binding_site
+    return np.sqrt(np.einsum("...i,...i->...", diff, diff))
+
+
+class DockingResult:
+    """Outcome of `run_docking`.
+
+    `binding_steps[m]` is the first step at which walker m came within the
+    binding radius of the site (-1 if it never did), `acceptance_rates[m]`
+    its fraction of accepted moves. `path` and `path_energies` hold the full
+    history of the tracked walker, for plotting, and `path_proposals[k]` the
+    energy of the move it proposed at step k + 1, accepted or not (the
+    quantity the single-ligand script plotted).
+    """
+
+    def __init__(self, positions, energies, binding_steps, acceptance_rates, path,
+                 path_energies, path_proposals, num_steps, seconds):
+        self.positions = positions
+        self.energies = energies
+        self.binding_steps = binding_steps
+        self.acceptance_rates = acceptance_rates
+        self.path = path
+        self.path_energies = path_energies
+        self.path_proposals = path_proposals
+        self.num_steps = num_steps
+        self.seconds = seconds
+
+    @property
+    def bound_fraction(self):
+        return float(np.mean(self.binding_steps >= 0))
+
+    @property
+    def walker_steps_per_second(self):
+        return len(self.positions) * self.num_steps / self.seconds if self.seconds else float("inf")
+
+    def summary(self):
+        bound = self.binding_steps[self.binding_steps >= 0]
+        mean_time = f"{bound.mean():.1f}" if len(bound) else "n/a"
+        return (f"{len(self.positions)} walkers x {self.num_steps} steps: "
+                f"{self.bound_fraction:.1%} bound (mean binding step {mean_time}), "
+                f"mean acceptance {self.acceptance_rates.mean():.1%}, "
+                f"{self.walker_steps_per_second / 1e6:.1f}M walker-steps/s")
+
+
+class DockingWalkers:
+    """State of M ligand walkers, advanced together by `step`.
+
+    `temperature` may be a scalar or an (M,) array, so the same walkers can
+    serve as the replicas of a parallel-tempering ladder. A walker counts as
+    bound once it is within `binding_radius` of the binding site, whatever
+    the `energy` function. `proposed_energy` is the energy of each walker's
+    last proposed move, accepted or not.
+    """
+
+    def __init__(self, num_walkers, start, binding_site, binding_radius=1.5, step_size=1.0,
+                 rng=None, energy=None):
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.binding_site = np.asarray(binding_site, dtype=float)
+        self.binding_radius = binding_radius
+        self.step_size = step_size
+        self.energy_function = energy
+        self.positions = np.empty((num_walkers, 3))
+        self.positions[:] = start
+        self.energy = self._energy(self.positions)
+        self.proposed_energy = self.energy.copy()
+        self.accepted = np.zeros(num_walkers, dtype=np.int64)
+        self.binding_steps = np.where(self._distance() <= binding_radius, 0, -1)
+        self.steps = 0
+        self._new_pos = np.empty_like(self.positions)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _energy(self, positions):
+        if self.energy_function is None:
+            return calculate_energy(positions, self.binding_site)
+        return self.energy_function(positions)
+
+    def _distance(self):
+        if self.energy_function is None:
+            return self.energy  # The default energy is the distance
+        return calculate_energy(self.positions, self.binding_site)
+
+    def step(self, temperature=1.0):
+        """One Metropolis step for every walker."""
+        pos, new_pos = self.positions, self._new_pos
+
+        # Propose a random move in 3D for every walker
+        self.rng.random(out=new_pos)
+        new_pos *= 2 * self.step_size
+        new_pos += pos - self.step_size
+        new_energy = self.proposed_energy = self._energy(new_pos)
+
+        # Accept moves based on the Metropolis criterion
+        delta = new_energy - self.energy
+        accept = self.rng.random(len(pos)) < np.exp(-np.maximum(delta, 0) / temperature)
+        np.copyto(pos, new_pos, where=accept[:, None])
+        np.copyto(self.energy, new_energy, where=accept)
+        self.accepted += accept
+
+        self.steps += 1
+        newly_bound = (self.binding_steps < 0) & (self._distance() <= self.binding_radius)
+        self.binding_steps[newly_bound] = self.steps
+
+
+def run_docking(num_walkers, num_steps, start, binding_site, temperature=1.0,
+                binding_radius=1.5, step_size=1.0, track=0, rng=None, energy=None):
+    """Advance `num_walkers` ligands for `num_steps` Metropolis steps.
+
+    Moves are uniform in [-step_size, step_size]^3 and accepted with
+    probability min(1, exp(-(E_new - E_old) / temperature)), exactly as in
+    the single-ligand script. Walker `track` has its path recorded. `rng` is
+    a `np.random.Generator`; `energy` replaces the distance energy (see
+    `DockingWalkers`).
+    """
+    walkers = DockingWalkers(num_walkers, start, binding_site, binding_radius, step_size, rng,
+                             energy)
+    path = np.empty((num_steps + 1, 3))
+    path_energies = np.empty(num_steps + 1)
+    path_proposals = np.empty(num_steps)
+    path[0], path_energies[0] = walkers.positions[track], walkers.energy[track]
+
+    begin = time.perf_counter()
+    with stats.timer("docking.run"):
+        for step in range(1, num_steps + 1):
+            walkers.step(temperature)
+            path[step], path_energies[step] = walkers.positions[track], walkers.energy[track]
+            path_proposals[step - 1] = walkers.proposed_energy[track]
+    seconds = time.perf_counter() - begin
+    stats.count("docking.move.proposed", num_walkers * num_steps)
+    stats.count("docking.move.accepted", int(walkers.accepted.sum()))
+    stats.count("docking.bound", int(np.count_nonzero(walkers.binding_steps >= 0)))
+
+    return DockingResult(walkers.positions, walkers.energy, walkers.binding_steps,
+                         walkers.accepted / max(num_steps, 1), path, path_energies,
+                         path_proposals, num_steps, seconds)
@@ -0,0 +1,15 @@
+"""Galaxy N-body simulation: force kernels, integrators and a configurable run.
+
+Run it with `python -m galaxy --help`; importing the package runs nothing
+and does not load any plotting library.
+"""
+
+from galaxy.backends import FORCE_BACKENDS, check_force_backend, make_force_backend
+from galaxy.barnes_hut import BarnesHutForce, Octree
+from galaxy.forces import DirectSumForce, compute_gravitational_force, potential_energy
+from galaxy.integrators import (INTEGRATORS, BlockTimestep, Leapfrog, SemiImplicitEuler,
+                               make_integrator, total_energy)
+from galaxy.parallel import ParallelForce
+from galaxy.simulation import (PRECISIONS, GalaxyConfig, SimulationResult, initial_conditions,
+                               precision_report, simulate)
+from galaxy.trajectory import TrajectoryWriter, open_trajectory
@@ -0,0 +1,35 @@
+import numpy as np
+
+from galaxy.barnes_hut import THETA, BarnesHutForce
+from galaxy.forces import G, SOFTENING, DirectSumForce
+from galaxy.parallel import ParallelForce
+
+FORCE_BACKENDS = ("direct", "barnes-hut")
+
+
+def check_force_backend(name="direct", workers=1, dtype=np.float64):
+    """Raise ValueError unless the named backend supports `workers` and `dtype`."""
+    if name not in FORCE_BACKENDS:
+        raise ValueError(f"Unknown force backend {name!r}; choose from {', '.join(FORCE_BACKENDS)}")
+    if name == "barnes-hut" and workers > 1:
+        raise ValueError("The parallel mode is only available for the direct backend")
+    if name == "barnes-hut" and np.dtype(dtype) != np.float64:
+        raise ValueError("Single-precision forces are only available for the direct backend")
+
+
+def make_force_backend(name="direct", G=G, softening=SOFTENING, theta=THETA, workers=1,
+                       dtype=np.float64):
+    """Return a force callable `f(pos, masses) -> (N, 3)` for the named backend.
+
+    "direct" is the exact blocked pair sum; "barnes-hut" is the O(N log N)
+    octree approximation controlled by the opening angle `theta`. With
+    `workers > 1` the direct sum is split across a shared-memory process pool.
+    A float32 `dtype` (pair tiles in single precision) is only available
+    for the direct sum; see `check_force_backend`.
+    """
+    check_force_backend(name, workers, dtype)
+    if name == "direct":
+        if workers > 1:
+            return ParallelForce(G, softening, workers=workers, dtype=dtype)
+        return DirectSumForce(G, softening, dtype=dtype)
+    return BarnesHutForce(G, softening, theta=theta)
@@ -0,0 +1,241 @@
+import time
+
+import numpy as np
+
+from galaxy.forces import G, SOFTENING, DirectSumForce
+
+THETA = 0.5  # Opening angle: smaller is more accurate, larger is faster
+LEAF_SIZE = 8  # Cells with at most this many stars are summed directly
+TARGET_BATCH = 4096  # Stars walked through the tree together
+MAX_DEPTH = 21  # 3 * 21 bits fit in one uint64 Morton key
+
+
+def _spread_bits(v):
+    """Insert two zero bits between each of the low 21 bits of v."""
+    v = v & np.uint64(0x1FFFFF)
+    v = (v | (v << np.uint64(32))) & np.uint64(0x1F00000000FFFF)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x1F0000FF0000FF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x100F00F00F00F00F)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x10C30C30C30C30C3)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x1249249249249249)
+    return v
+
+
+def _expand(starts, counts):
+    """Flatten the ranges [start, start + count) into one index array."""
+    total = counts.sum()
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + np.arange(total) - offsets
+
+
+def _range_sums(values, starts, ends):
+    """Sum values[start:end] for every (start, end) pair along axis 0."""
+    padded = np.concatenate([values, np.zeros_like(values[:1])])
+    bounds = np.column_stack([starts, ends]).ravel()
+    return np.add.reduceat(padded, bounds, axis=0)[::2]
+
+
+class Octree:
+    """Array-backed octree over Morton-sorted particles.
+
+    Nodes are stored level by level in flat arrays; the children of a node
+    are contiguous, so `first_child[k]` and `num_children[k]` describe them
+    (`first_child` is -1 for leaves). Each node covers the sorted particle
+    range `start[k]:end[k]` and carries its total mass and centre of mass.
+    """
+
+    def __init__(self, pos, masses, leaf_size=LEAF_SIZE, max_depth=MAX_DEPTH):
+        n = len(pos)
+        lo = pos.min(axis=0)
+        span = float((pos.max(axis=0) - lo).max()) or 1.0
+        span *= 1 + 1e-9  # Keep the farthest star strictly inside the root
+        cells = np.uint64(1) << np.uint64(max_depth)
+        coords = np.floor((pos - lo) * (float(cells) / span)).astype(np.int64)
+        coords = np.clip(coords, 0, int(cells) - 1).astype(np.uint64)
+        keys = (_spread_bits(coords[:, 0]) << np.uint64(2)) \
+            | (_spread_bits(coords[:, 1]) << np.uint64(1)) \
+            | _spread_bits(coords[:, 2])
+
+        # Stable sort so nearly sorted keys from the previous step are cheap
+        self.order = np.argsort(keys, kind="stable")
+        keys = keys[self.order]
+        coords = coords[self.order]
+
+        starts, ends, levels = [np.array([0])], [np.array([n])], [np.array([0])]
+        first_child = []
+        num_children = []
+        node_count = 1
+        frontier_start, frontier_end = starts[0], ends[0]
+        for level in range(max_depth + 1):
+            split = (frontier_end - frontier_start > leaf_size) & (level < max_depth)
+            children_first = np.full(len(frontier_start), -1)
+            children_num = np.zeros(len(frontier_start), dtype=np.int64)
+            if split.any():
+                s, e = frontier_start[split], frontier_end[split]
+                idx = _expand(s, e - s)
+                shift = np.uint64(3 * (max_depth - level - 1))
+                prefix = keys[idx] >> shift
+                boundary = np.ones(len(idx), dtype=bool)
+                boundary[1:] = prefix[1:] != prefix[:-1]
+                boundary[np.cumsum(e - s)[:-1]] = True  # New parent range
+                child_start = idx[boundary]
+                child_end = np.append(child_start[1:], 0)
+                last = np.cumsum(boundary)[np.cumsum(e - s) - 1] - 1
+                child_end[last] = e
+                per_parent = np.diff(np.concatenate([[0], last + 1]))
+                children_first[split] = node_count + np.cumsum(per_parent) - per_parent
+                children_num[split] = per_parent
+                frontier_start, frontier_end = child_start, child_end
+                starts.append(child_start)
+                ends.append(child_end)
+                levels.append(np.full(len(child_start), level + 1))
+                node_count += len(child_start)
+            first_child.append(children_first)
+            num_children.append(children_num)
+            if not split.any():
+                break
+
+        self.start = np.concatenate(starts)
+        self.end = np.concatenate(ends)
+        self.first_child = np.concatenate(first_child)
+        self.num_children = np.concatenate(num_children)
+        level = np.concatenate(levels)
+
+        sorted_pos = pos[self.order]
+        sorted_mass = masses[self.order]
+        self.mass = _range_sums(sorted_mass, self.start, self.end)
+        weighted = _range_sums(sorted_pos * sorted_mass[:, None], self.start, self.end)
+        self.com = weighted / self.mass[:, None]
+        self.size = span / 2.0 ** level
+        corner = coords[self.start] >> (np.uint64(max_depth) - level.astype(np.uint64))[:, None]
+        self.center = lo + (corner.astype(float) + 0.5) * self.size[:, None]
+        self.sorted_pos = sorted_pos
+        self.sorted_mass = sorted_mass
+
+    def __len__(self):
+        return len(self.start)
+
+
+class BarnesHutForce:
+    """O(N log N) Barnes-Hut approximation of the direct-sum gravity kernel.
+
+    A cell of size s at distance d from a star is replaced by a point mass
+    at its centre of mass when s / d < theta and the star lies outside the
+    cell; otherwise the cell is opened. Leaves are summed exactly with the
+    same softened pair force as `DirectSumForce`, so theta -> 0 recovers it.
+    The tree is rebuilt on every call, i.e. once per TIME_STEP.
+    """
+
+    def __init__(self, G=G, softening=SOFTENING, theta=THETA, leaf_size=LEAF_SIZE,
+                 target_batch=TARGET_BATCH):
+        if theta < 0:
+            raise ValueError("theta must be non-negative")
+        self.G = G
+        self.softening = softening
+        self.theta = theta
+        self.leaf_size = leaf_size
+        self.target_batch = target_batch
+        self.tree = None
+
+    def __call__(self, pos, masses, out=None):
+        """Return the (N, 3) force on every particle."""
+        force = np.zeros_like(pos, dtype=float) if out is None else out
+        force.fill(0.0)
+        if len(pos) == 0:
+            return force
+        self.tree = Octree(pos, masses, self.leaf_size)
+        for t0 in range(0, len(pos), self.target_batch):
+            targets = np.arange(t0, min(t0 + self.target_batch, len(pos)))
+            force[targets] = self._walk(pos, masses, targets)
+        return force
+
+    def force_on(self, pos, masses, targets):
+        """Return the (T, 3) force on the particles `targets` from all particles."""
+        targets = np.asarray(targets)
+        force = np.zeros((len(targets), 3))
+        if len(targets) == 0:
+            return force
+        self.tree = Octree(pos, masses, self.leaf_size)
+        for t0 in range(0, len(targets), self.target_batch):
+            force[t0:t0 + self.target_batch] = self._walk(pos, masses,
+                                                          targets[t0:t0 + self.target_batch])
+        return force
+
+    def _pair_force(self, target_pos, target_mass, source_pos, source_mass):
+        diff = source_pos - target_pos
+        dist = np.sqrt(np.einsum("ij,ij->i", diff, diff)) + self.softening
+        return diff * (self.G * target_mass * source_mass / dist**3)[:, None]
+
+    def _walk(self, pos, masses, targets):
+        """Traverse the tree for a batch of targets, one level per pass."""
+        tree = self.tree
+        count = len(targets)
+        total = np.zeros((count, 3))
+        local = np.arange(count)  # Row in `total` for every (target, node) pair
+        node = np.zeros(count, dtype=np.int64)
+        while len(local):
+            target = targets[local]
+            x = pos[target]
+            diff = tree.com[node] - x
+            dist = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+            inside = np.all(np.abs(x - tree.center[node]) <= 0.5 * tree.size[node, None], axis=1)
+            far = (tree.size[node] < self.theta * dist) & ~inside
+
+            # Accepted cells act as a single point mass
+            if far.any():
+                f = self._pair_force(x[far], masses[target[far]], tree.com[node[far]],
+                                     tree.mass[node[far]])
+                for k in range(3):
+                    total[:, k] += np.bincount(local[far], f[:, k], minlength=count)
+
+            # Leaves that are too close are summed star by star
+            leaf = ~far & (tree.first_child[node] < 0)
+            if leaf.any():
+                s, e = tree.start[node[leaf]], tree.end[node[leaf]]
+                src = _expand(s, e - s)
+                rows = np.repeat(local[leaf], e - s)
+                tgt = targets[rows]
+                f = self._pair_force(pos[tgt], masses[tgt], tree.sorted_pos[src],
+                                     tree.sorted_mass[src])
+                for k in range(3):
+                    total[:, k] += np.bincount(rows, f[:, k], minlength=count)
+
+            # Everything else is opened into its children
+            opened = ~far & ~leaf
+            n_child = tree.num_children[node[opened]]
+            node = _expand(tree.first_child[node[opened]], n_child)
+            local = np.repeat(local[opened], n_child)
+        return total
+
+
+def accuracy_report(sizes=(1000, 4000), thetas=(0.3, 0.5, 0.7, 1.0), seed=42):
+    """Compare Barnes-Hut against the direct sum on the astro initial conditions.
+
+    Returns one dict per (N, theta) with wall times, speed-up and the median
+    and maximum relative force error.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for n in sizes:
+        pos = rng.uniform(-5, 5, (n, 3))
+        masses = rng.uniform(0.5, 1.5, n)
+        start = time.perf_counter()
+        exact = DirectSumForce()(pos, masses)
+        direct_time = time.perf_counter() - start
+        norm = np.linalg.norm(exact, axis=1)
+        for theta in thetas:
+            start = time.perf_counter()
+            approx = BarnesHutForce(theta=theta)(pos, masses)
+            bh_time = time.perf_counter() - start
+            error = np.linalg.norm(approx - exact, axis=1) / norm
+            rows.append({
+                "N": n,
+                "theta": theta,
+                "direct_s": direct_time,
+                "barnes_hut_s": bh_time,
+                "speedup": direct_time / bh_time,
+                "median_rel_error": float(np.median(error)),
+                "max_rel_error": float(error.max()),
+            })
+    return rows
+
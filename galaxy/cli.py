@@ -0,0 +1,62 @@
+"""Command-line interface of the galaxy simulation, `python -m galaxy [options]`."""
+import argparse
+
+from galaxy.backends import FORCE_BACKENDS, check_force_backend
+from galaxy.integrators import INTEGRATORS
+from galaxy.render import RENDER_STYLES, render
+from galaxy.simulation import PRECISIONS, GalaxyConfig, simulate
+
+
+def parse_args(argv=None):
+    defaults = GalaxyConfig()
+    parser = argparse.ArgumentParser(prog="python -m galaxy",
+                                     description="Galaxy formation N-body simulation.")
+    parser.add_argument("-n", "--particles", type=int, default=defaults.num_particles)
+    parser.add_argument("--steps", type=int, default=defaults.num_steps)
+    parser.add_argument("--dt", type=float, default=defaults.time_step)
+    parser.add_argument("--softening", type=float, default=defaults.softening)
+    parser.add_argument("--backend", choices=FORCE_BACKENDS, default=defaults.backend)
+    parser.add_argument("--theta", type=float, default=defaults.theta)
+    parser.add_argument("--workers", type=int, default=defaults.workers)
+    parser.add_argument("--integrator", choices=INTEGRATORS, default=defaults.integrator)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--precision", choices=list(PRECISIONS), default=defaults.precision,
+                        help="float32 forces ('mixed') and state ('single') for speed and memory")
+    parser.add_argument("--trajectory", default=defaults.trajectory_file)
+    parser.add_argument("--checkpoint", help="write restart checkpoints to this file")
+    parser.add_argument("--checkpoint-interval", type=float, default=defaults.checkpoint_interval,
+                        help="seconds between checkpoints")
+    parser.add_argument("--restart", action="store_true",
+                        help="continue from the --checkpoint file")
+    parser.add_argument("--render", choices=RENDER_STYLES + ("none",), default="glow",
+                        help="animation style, or 'none' for a headless run")
+    parser.add_argument("--output", help="animation file (.html or .json)")
+    parser.add_argument("--max-frames", type=int, default=200)
+    parser.add_argument("--no-open", action="store_true", help="do not open the animation")
+    args = parser.parse_args(argv)
+    try:
+        check_force_backend(args.backend, args.workers, PRECISIONS[args.precision][0])
+    except ValueError as error:
+        parser.error(str(error))
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = GalaxyConfig(num_particles=args.particles, time_step=args.dt, num_steps=args.steps,
+                          softening=args.softening, backend=args.backend, theta=args.theta,
+                          workers=args.workers, integrator=args.integrator, seed=args.seed,
+                          trajectory_file=args.trajectory, checkpoint_file=args.checkpoint,
+                          checkpoint_interval=args.checkpoint_interval,
+                          precision=args.precision)
+    result = simulate(config, restart=args.restart)
+    print(result.summary())
+    if args.render != "none":  # Plotly is only imported inside render
+        path = render(result, args.render, args.max_frames, args.output,
+                      auto_open=not args.no_open)
+        print(f"Animation written to {path}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import numpy as np
+
+# Defaults shared with the astro scripts
+G = 1  # Gravitational constant (scaled for visualization)
+SOFTENING = 0.1  # To prevent singularities in the gravitational force
+BLOCK_SIZE = 256  # Particles per tile; scratch memory is O(BLOCK_SIZE**2)
+
+
+def pair_tile(coords_i, mass_i, coords_j, mass_j, G, softening, sep, dist, weight):
+    """Weighted pair separations of one tile, computed in the scratch buffers.
+
+    `coords_i` (3, rows) and `coords_j` (3, cols) hold the particles' x, y
+    and z rows; `sep` (3, B, B), `dist` and `weight` (B, B) are scratch of
+    the working dtype. Returns the (3, rows, cols) view of `sep` holding
+    G * m_i * m_j * (r_j - r_i) / (|r_j - r_i| + softening)**3: its sum over
+    axis 2 is the force on the I particles, and minus its sum over axis 1
+    the force on the J particles. Every operation runs over contiguous
+    (rows, cols) planes.
+    """
+    rows, cols = coords_i.shape[1], coords_j.shape[1]
+    sep = sep[:, :rows, :cols]
+    dist = dist[:rows, :cols]
+    weight = weight[:rows, :cols]
+
+    np.subtract(coords_j[:, None, :], coords_i[:, :, None], out=sep)
+    np.multiply(sep[0], sep[0], out=dist)
+    for axis in (1, 2):
+        np.multiply(sep[axis], sep[axis], out=weight)
+        dist += weight
+    np.sqrt(dist, out=dist)
+    dist += softening
+    np.multiply.outer(mass_i, mass_j, out=weight)
+    weight *= G
+    weight /= dist
+    weight /= dist
+    weight /= dist
+    sep *= weight
+    return sep
+
+
+class DirectSumForce:
+    """Exact O(N^2) pairwise gravity evaluated in blocked NumPy tiles.
+
+    The pair force is the same one the astro scripts always used,
+    G * m_i * m_j * (r_j - r_i) / (|r_j - r_i| + softening)**3, so results
+    match the original per-particle loop to rounding. Each tile pair (I, J)
+    with J >= I is evaluated once and applied to both sides (Newton's third
+    law). Tiles are computed by `pair_tile` on per-axis (3, B, B) scratch
+    buffers sized by `block_size`, so peak memory does not grow with N.
+
+    `dtype` is the precision of the tiles. With np.float32 each tile's sums
+    over at most `block_size` pairs are formed in float32; the sums across
+    tiles and the returned forces are always float64.
+    """
+
+    def __init__(self, G=G, softening=SOFTENING, block_size=BLOCK_SIZE, dtype=np.float64):
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+        self.G = G
+        self.softening = softening
+        self.block_size = block_size
+        self.dtype = np.dtype(dtype)
+        self._capacity = 0
+
+    def _reserve(self, size):
+        """Grow the scratch buffers so a size x size tile fits."""
+        if size <= self._capacity:
+            return
+        self._sep = np.empty((3, size, size), dtype=self.dtype)  # Per-axis separations
+        self._dist = np.empty((size, size), dtype=self.dtype)  # Softened distance
+        self._weight = np.empty((size, size), dtype=self.dtype)  # G * m_i * m_j / dist**3
+        self._capacity = size
+
+    def _tile(self, coords_i, mass_i, coords_j, mass_j):
+        return pair_tile(coords_i, mass_i, coords_j, mass_j, self.G, self.softening,
+                         self._sep, self._dist, self._weight)
+
+    def __call__(self, pos, masses, out=None):
+        """Return the (N, 3) force on every particle."""
+        n = len(pos)
+        force = np.zeros_like(pos, dtype=float) if out is None else out
+        force.fill(0.0)
+        if n == 0:
+            return force
+        b = min(self.block_size, n)
+        self._reserve(b)
+        coords = np.ascontiguousarray(pos.T, dtype=self.dtype)  # (3, N)
+        masses = masses.astype(self.dtype, copy=False)
+
+        for i0 in range(0, n, b):
+            i1 = min(i0 + b, n)
+            for j0 in range(i0, n, b):
+                j1 = min(j0 + b, n)
+                sep = self._tile(coords[:, i0:i1], masses[i0:i1], coords[:, j0:j1],
+                                 masses[j0:j1])
+                force[i0:i1] += sep.sum(axis=2).T
+                if j0 != i0:
+                    # The same tile seen from block J is the exact negative
+                    force[j0:j1] -= sep.sum(axis=1).T
+        return force
+
+    def force_on(self, pos, masses, targets):
+        """Return the (T, 3) force on the particles `targets` from all particles."""
+        targets = np.asarray(targets)
+        force = np.zeros((len(targets), 3))
+        b = min(self.block_size, max(len(pos), 1))
+        self._reserve(b)
+        coords = np.ascontiguousarray(pos.T, dtype=self.dtype)
+        masses = masses.astype(self.dtype, copy=False)
+        target_forces(coords, masses, targets, target_chunks(len(targets), b), self.G,
+                      self.softening, b, (self._sep, self._dist, self._weight), force)
+        return force
+
+
+def target_chunks(count, block_size):
+    """(t0, t1) ranges splitting `count` targets into blocks."""
+    return [(t0, min(t0 + block_size, count)) for t0 in range(0, count, block_size)]
+
+
+def target_forces(coords, masses, targets, chunks, G, softening, block_size, scratch, out):
+    """Write into out[t0:t1] the force on targets[t0:t1] for each of `chunks`.
+
+    Sources are visited in fixed blocks in index order, so a target's force
+    does not depend on which chunks are computed together.
+    """
+    n = coords.shape[1]
+    for t0, t1 in chunks:
+        chunk = targets[t0:t1]
+        coords_t, mass_t = coords[:, chunk], masses[chunk]
+        total = np.zeros((t1 - t0, 3))
+        for j0 in range(0, n, block_size):
+            j1 = min(j0 + block_size, n)
+            sep = pair_tile(coords_t, mass_t, coords[:, j0:j1], masses[j0:j1], G, softening,
+                            *scratch)
+            total += sep.sum(axis=2).T
+        out[t0:t1] = total
+
+
+def potential_energy(pos, masses, G=G, softening=SOFTENING, block_size=BLOCK_SIZE):
+    """Total potential energy of the softened pair force, in blocked tiles.
+
+    The pair potential -G m_i m_j (r + softening / 2) / (r + softening)**2 is
+    the one whose negative gradient is the force of `DirectSumForce`, so it
+    is the right quantity for energy-conservation checks. It is always
+    evaluated in float64.
+    """
+    pos = np.asarray(pos, dtype=float)
+    n = len(pos)
+    total = 0.0
+    for i0 in range(0, n, block_size):
+        i1 = min(i0 + block_size, n)
+        for j0 in range(i0, n, block_size):
+            j1 = min(j0 + block_size, n)
+            diff = pos[None, j0:j1] - pos[i0:i1, None]
+            dist = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff)) + softening
+            pair = np.multiply.outer(masses[i0:i1], masses[j0:j1]) * (dist - softening / 2) / dist**2
+            if j0 == i0:
+                pair = np.triu(pair, k=1)  # Each pair once, no self-energy
+            total -= G * pair.sum()
+    return total
+
+
+def compute_gravitational_force(pos, masses, G=G, softening=SOFTENING, block_size=BLOCK_SIZE):
+    """Compute gravitational forces for all particles (blocked direct sum)."""
+    return DirectSumForce(G, softening, block_size)(pos, masses)
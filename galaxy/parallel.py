@@ -0,0 +1,279 @@
+import multiprocessing
+import os
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from galaxy.forces import (BLOCK_SIZE, G, SOFTENING, DirectSumForce, pair_tile, target_chunks,
+                           target_forces)
+
+# State attached once per worker process (see _attach)
+_shared = {}
+
+
+def tile_pairs(n, block_size):
+    """Every tile pair (i0, j0) with j0 >= i0 of the blocked pair sum."""
+    starts = range(0, n, block_size)
+    return [(i0, j0) for i0 in starts for j0 in starts if j0 >= i0]
+
+
+def _scratch(block_size, dtype=np.float64):
+    """Per-worker tile buffers for `pair_tile`."""
+    return (np.empty((3, block_size, block_size), dtype=dtype),
+            np.empty((block_size, block_size), dtype=dtype),
+            np.empty((block_size, block_size), dtype=dtype))
+
+
+def tile_sums(coords, masses, pairs, slots, G, softening, block_size, scratch, out):
+    """Write the force sums of the tile pairs numbered `slots` into out[slot].
+
+    `out` is (pairs, 2, B, 3): out[k, 0, :rows] is the force of tile pair
+    k = (I, J) on block I and out[k, 1, :cols] minus its force on block J
+    (Newton's third law). Each slot depends only on its own tile, so it is
+    the same whichever worker computes it.
+    """
+    n = coords.shape[1]
+    for k in slots:
+        i0, j0 = pairs[k]
+        i1, j1 = min(i0 + block_size, n), min(j0 + block_size, n)
+        sep = pair_tile(coords[:, i0:i1], masses[i0:i1], coords[:, j0:j1], masses[j0:j1], G,
+                        softening, *scratch)
+        out[k, 0, :i1 - i0] = sep.sum(axis=2).T
+        if j0 != i0:
+            out[k, 1, :j1 - j0] = sep.sum(axis=1).T
+
+
+def reduce_tiles(pairs, sums, block_size, out):
+    """Sum the tile forces `sums` into `out` (N, 3) in tile-pair order.
+
+    This is the order in which `DirectSumForce` adds the same tiles, so the
+    result is bit-for-bit the serial one.
+    """
+    n = len(out)
+    out.fill(0.0)
+    for k, (i0, j0) in enumerate(pairs):
+        i1, j1 = min(i0 + block_size, n), min(j0 + block_size, n)
+        out[i0:i1] += sums[k, 0, :i1 - i0]
+        if j0 != i0:
+            out[j0:j1] -= sums[k, 1, :j1 - j0]
+
+
+def _attach(names, n, G, softening, block_size, dtype):
+    """Process-pool initializer: map the shared arrays into this worker."""
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    b = min(block_size, n)
+    pairs = tile_pairs(n, b)
+    _shared["blocks"] = blocks  # Keep the mappings alive
+    _shared["coords"] = np.ndarray((3, n), dtype=dtype, buffer=blocks[0].buf)
+    _shared["masses"] = np.ndarray((n,), dtype=dtype, buffer=blocks[1].buf)
+    _shared["sums"] = np.ndarray((len(pairs), 2, b, 3), dtype=dtype, buffer=blocks[2].buf)
+    _shared["targets"] = np.ndarray((n,), dtype=np.int64, buffer=blocks[3].buf)
+    _shared["target_force"] = np.ndarray((n, 3), buffer=blocks[4].buf)
+    _shared["pairs"] = pairs
+    _shared["params"] = (G, softening, b)
+    _shared["scratch"] = _scratch(b, dtype)
+
+
+def _run_tiles(slots):
+    G, softening, block_size = _shared["params"]
+    tile_sums(_shared["coords"], _shared["masses"], _shared["pairs"], slots, G, softening,
+              block_size, _shared["scratch"], _shared["sums"])
+
+
+def _run_targets(count, chunks):
+    G, softening, block_size = _shared["params"]
+    target_forces(_shared["coords"], _shared["masses"], _shared["targets"][:count], chunks, G,
+                  softening, block_size, _shared["scratch"], _shared["target_force"])
+
+
+def _release(executor, blocks):
+    if executor is not None:
+        executor.shutdown(wait=True)
+    for block in blocks:
+        block.unlink()
+        try:
+            block.close()
+        except BufferError:
+            pass  # Array views are still alive at interpreter exit
+
+
+class ParallelForce:
+    """Direct-sum gravity with the tile pairs spread over a worker pool.
+
+    The (I, J >= I) tile pairs of `DirectSumForce` are dealt round-robin
+    into one job per worker. Each pair is evaluated once, with the worker's
+    own scratch, and its sums on both blocks are written to a slot of its
+    own (`tile_sums`). The parent then adds the slots in tile-pair order
+    (`reduce_tiles`), the order of the serial kernel. The slots take
+    about 24 N**2 / block_size bytes. `force_on` deals blocks of targets
+    over the pool the same way, each computed against every source in a
+    fixed order (for block time steps). With `mode="process"` the
+    coordinates, masses and tile sums live in `multiprocessing.shared_memory`
+    blocks that workers map once, so a step only ships slot numbers.
+    `mode="thread"` shares the arrays directly and relies on NumPy
+    releasing the GIL. `dtype` is the precision of the tiles, their sums
+    and the shared coordinates, as in `DirectSumForce`. Forces are
+    bit-for-bit those of `DirectSumForce` with the same dtype, whatever the
+    worker count and mode, so runs (and restarts) do not depend on
+    `workers`.
+    """
+
+    def __init__(self, G=G, softening=SOFTENING, workers=None, mode="process",
+                 block_size=BLOCK_SIZE, dtype=np.float64):
+        if mode not in ("process", "thread"):
+            raise ValueError("mode must be 'process' or 'thread'")
+        self.G = G
+        self.softening = softening
+        self.workers = workers or os.cpu_count() or 1
+        self.mode = mode
+        self.block_size = block_size
+        self.dtype = np.dtype(dtype)
+        self._n = None
+        self._executor = None
+        self._finalizer = None
+
+    def _setup(self, n):
+        """(Re)create the pool and shared buffers for n particles."""
+        self.close()
+        self._n = n
+        b = self._b = min(self.block_size, n)  # As in DirectSumForce, for identical tiles
+        self._pairs = tile_pairs(n, b)
+        slots = range(len(self._pairs))
+        self._jobs = [job for job in (slots[k::self.workers] for k in range(self.workers)) if job]
+        shape = (len(self._pairs), 2, b, 3)
+        if self.mode == "thread":
+            self._executor = ThreadPoolExecutor(self.workers)
+            self._coords = np.empty((3, n), dtype=self.dtype)
+            self._masses = np.empty(n, dtype=self.dtype)
+            self._sums = np.empty(shape, dtype=self.dtype)
+            self._targets, self._target_force = np.empty(n, dtype=np.int64), np.empty((n, 3))
+            self._scratch = [_scratch(b, self.dtype) for _ in range(self.workers)]
+            return
+        size = self.dtype.itemsize
+        blocks = [shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+                  for nbytes in (n * 3 * size, n * size, int(np.prod(shape)) * size, n * 8,
+                                 n * 3 * 8)]
+        self._coords = np.ndarray((3, n), dtype=self.dtype, buffer=blocks[0].buf)
+        self._masses = np.ndarray((n,), dtype=self.dtype, buffer=blocks[1].buf)
+        self._sums = np.ndarray(shape, dtype=self.dtype, buffer=blocks[2].buf)
+        self._targets = np.ndarray((n,), dtype=np.int64, buffer=blocks[3].buf)
+        self._target_force = np.ndarray((n, 3), buffer=blocks[4].buf)
+        # fork keeps the astro scripts from being re-imported in every worker
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        self._executor = ProcessPoolExecutor(
+            self.workers, mp_context=context, initializer=_attach,
+            initargs=([block.name for block in blocks], n, self.G, self.softening,
+                      self.block_size, self.dtype))
+        self._finalizer = weakref.finalize(self, _release, self._executor, blocks)
+
+    def _load(self, pos, masses):
+        if len(pos) != self._n:
+            self._setup(len(pos))
+        self._coords[:] = pos.T
+        self._masses[:] = masses
+
+    def __call__(self, pos, masses, out=None):
+        """Return the (N, 3) force on every particle."""
+        force = np.zeros_like(pos, dtype=float) if out is None else out
+        if len(pos) == 0:
+            force.fill(0.0)
+            return force
+        self._load(pos, masses)
+
+        if self.mode == "thread":
+            futures = [self._executor.submit(tile_sums, self._coords, self._masses, self._pairs,
+                                             slots, self.G, self.softening, self._b,
+                                             self._scratch[k], self._sums)
+                       for k, slots in enumerate(self._jobs)]
+        else:
+            futures = [self._executor.submit(_run_tiles, slots) for slots in self._jobs]
+        for future in futures:
+            future.result()
+
+        reduce_tiles(self._pairs, self._sums, self._b, force)
+        return force
+
+    def force_on(self, pos, masses, targets):
+        """Return the (T, 3) force on the particles `targets` from all particles."""
+        targets = np.asarray(targets)
+        count = len(targets)
+        if count == 0 or len(pos) == 0:
+            return np.zeros((count, 3))
+        self._load(pos, masses)
+        self._targets[:count] = targets
+
+        chunks = target_chunks(count, self._b)
+        jobs = [job for job in (chunks[k::self.workers] for k in range(self.workers)) if job]
+        if self.mode == "thread":
+            futures = [self._executor.submit(target_forces, self._coords, self._masses,
+                                             self._targets[:count], job, self.G, self.softening,
+                                             self._b, self._scratch[k],
+                                             self._target_force)
+                       for k, job in enumerate(jobs)]
+        else:
+            futures = [self._executor.submit(_run_targets, count, job) for job in jobs]
+        for future in futures:
+            future.result()
+        return self._target_force[:count].copy()
+
+    def close(self):
+        """Shut the pool down and free any shared memory."""
+        if self._finalizer is not None:
+            # Drop buffer views first
+            self._coords = self._masses = self._sums = None
+            self._targets = self._target_force = None
+            self._finalizer()
+            self._finalizer = None
+        elif self._executor is not None:
+            self._executor.shutdown(wait=True)
+        self._executor = None
+        self._n = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def scaling_report(num_particles=4000, max_workers=None, steps=3, mode="process", seed=42):
+    """Time the parallel kernel for 1..max_workers workers against the serial one.
+
+    Returns one dict per worker count with seconds per force evaluation,
+    speed-up and parallel efficiency relative to the serial
+    `DirectSumForce`, and the largest force difference from it relative to
+    the largest force.
+    """
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(-5, 5, (num_particles, 3))
+    masses = rng.uniform(0.5, 1.5, num_particles)
+
+    serial = DirectSumForce()
+    reference = serial(pos, masses)
+    start = time.perf_counter()
+    for _ in range(steps):
+        serial(pos, masses, out=reference)
+    base = (time.perf_counter() - start) / steps
+    scale = np.abs(reference).max()
+
+    rows = [{"workers": "serial", "seconds_per_step": base, "speedup": 1.0, "efficiency": 1.0,
+             "max_difference": 0.0}]
+    for workers in range(1, (max_workers or os.cpu_count() or 1) + 1):
+        with ParallelForce(workers=workers, mode=mode) as kernel:
+            force = kernel(pos, masses)  # Warm-up: starts the pool
+            start = time.perf_counter()
+            for _ in range(steps):
+                kernel(pos, masses, out=force)
+            seconds = (time.perf_counter() - start) / steps
+        rows.append({
+            "workers": workers,
+            "seconds_per_step": seconds,
+            "speedup": base / seconds,
+            "efficiency": base / seconds / workers,
+            "max_difference": float(np.abs(force - reference).max() / scale),
+        })
+    return rows
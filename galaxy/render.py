@@ -0,0 +1,82 @@
+"""Plotly animations of a galaxy run, one style per original astro script.
+
+* "glow": stars on black, brightness by distance from the centre (astro.py);
+* "height": coloured by z on fixed axes (astro0.py);
+* "sizes": like "glow" with a random size per star (astro2.py).
+
+Plotly is only imported when `render` or `animation` is called.
+"""
+import numpy as np
+
+from instrumentation import stats
+
+RENDER_STYLES = ("glow", "height", "sizes")
+ANIMATION_FILES = {
+    "glow": "galaxy_animation.html",
+    "height": "galaxy_animation.html",
+    "sizes": "galaxy_sizes_animation.html",
+}
+TITLES = {
+    "glow": "Galaxy Formation Simulation",
+    "height": "Galaxy Formation Simulation",
+    "sizes": "Galaxy Formation Simulation with Star Sizes",
+}
+MAX_FRAMES = 200  # Animation frames kept (steps are decimated to fit)
+
+
+def render(result, style="glow", max_frames=MAX_FRAMES, animation_file=None, auto_open=True):
+    """Write the animation of `result` (a `SimulationResult`) and return its path.
+
+    The file defaults to `ANIMATION_FILES[style]`; a .json name writes the
+    figure as JSON instead of standalone HTML.
+    """
+    from plotly_frames import write_animation
+
+    if style not in RENDER_STYLES:
+        raise ValueError(f"Unknown render style {style!r}; choose from {', '.join(RENDER_STYLES)}")
+    with stats.timer("galaxy.render.frames"):
+        fig = animation(result, style, max_frames)
+    path = animation_file or ANIMATION_FILES[style]
+    with stats.timer("galaxy.render.write"):
+        write_animation(fig, path, auto_open=auto_open)
+    return path
+
+
+def animation(result, style="glow", max_frames=MAX_FRAMES):
+    """The animated figure (a plain dict) of `result` in the given style."""
+    from plotly_frames import (animation_figure, distance_colors, frame_indices,
+                               scatter3d_frames, scatter3d_trace)
+
+    positions_over_time = result.trajectory
+    frame_ids = frame_indices(len(positions_over_time), max_frames=max_frames)
+
+    if style == "height":
+        colors = np.asarray(positions_over_time[frame_ids, :, 2], dtype=np.float32)  # Color by z
+        star_marker = dict(size=3, colorscale='Viridis')
+        scene = dict(
+            xaxis=dict(range=[-10, 10]),
+            yaxis=dict(range=[-10, 10]),
+            zaxis=dict(range=[-10, 10]),
+        )
+    else:
+        colors = distance_colors(positions_over_time, frame_ids)  # Brightness by distance
+        star_marker = dict(
+            size=result.sizes.astype(np.float32) if style == "sizes" else 4,
+            colorscale='Bluered',  # Glowing stars look
+            opacity=0.8  # Semi-transparent stars
+        )
+        scene = dict(
+            xaxis=dict(visible=False),  # Hide axes
+            yaxis=dict(visible=False),  # Hide axes
+            zaxis=dict(visible=False),  # Hide axes
+            bgcolor="black"  # Black background for space effect
+        )
+
+    frames = scatter3d_frames(positions_over_time, frame_ids, star_marker, colors=colors,
+                              name="Stars")
+    return animation_figure(
+        data=[scatter3d_trace(positions_over_time[0], dict(star_marker, color=colors[0]))],
+        frames=frames,
+        layout=dict(title=TITLES[style], scene=scene),
+        duration=50,
+    )
@@ -0,0 +1,218 @@
+"""The galaxy N-body run behind astro.py, astro0.py and astro2.py.
+
+`GalaxyConfig` holds every parameter the scripts used to hard-code, and
+`simulate(config)` runs the integration, streaming frames to the trajectory
+file. With a `checkpoint_file` the full state is saved atomically every
+`checkpoint_interval` seconds, and `simulate(config, restart=True)`
+continues bit for bit from the last checkpoint. Nothing runs at import
+time and no plotting library is imported here; see `galaxy.render` and
+`python -m galaxy --help`.
+
+`precision` trades accuracy for speed and memory (see `PRECISIONS`):
+
+* "double": float64 everywhere (the astro scripts' behaviour);
+* "mixed": float32 pair-force tiles, summed into float64 forces, with
+  float64 positions and velocities and a float32 trajectory file;
+* "single": as "mixed", but the positions and velocities themselves are
+  float32, so the integration increments are rounded too.
+
+Energies are always evaluated in float64.
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from checkpoint import CHECKPOINT_INTERVAL, Checkpointer, check_parameters
+from galaxy.backends import check_force_backend, make_force_backend
+from galaxy.integrators import (integrator_state, make_integrator, restore_integrator,
+                                total_energy)
+from galaxy.trajectory import TrajectoryWriter, open_trajectory
+from instrumentation import stats
+
+# precision -> (pair-force dtype, position / velocity dtype, trajectory dtype)
+PRECISIONS = {
+    "double": (np.float64, np.float64, np.float64),
+    "mixed": (np.float32, np.float64, np.float32),
+    "single": (np.float32, np.float32, np.float32),
+}
+
+
+class GalaxyConfig:
+    """Parameters of one galaxy run (defaults are those of the astro scripts)."""
+
+    def __init__(self, num_particles=200, G=1, time_step=0.01, num_steps=500, softening=0.1,
+                 backend="direct", theta=0.5, workers=1, integrator="euler", seed=42,
+                 trajectory_file="galaxy_trajectory.npy", checkpoint_file=None,
+                 checkpoint_interval=CHECKPOINT_INTERVAL, precision="double"):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision!r}; choose from {', '.join(PRECISIONS)}")
+        check_force_backend(backend, workers, PRECISIONS[precision][0])
+        self.num_particles = num_particles  # Number of stars
+        self.G = G  # Gravitational constant (scaled for visualization)
+        self.time_step = time_step  # Time step for integration
+        self.num_steps = num_steps  # Number of simulation steps
+        self.softening = softening  # To prevent singularities in the gravitational force
+        self.backend = backend  # "direct" (exact) or "barnes-hut" (O(N log N) octree)
+        self.theta = theta  # Barnes-Hut opening angle (smaller is more accurate)
+        self.workers = workers  # Worker processes for the direct force sum (1 = serial)
+        self.integrator = integrator  # "euler", "leapfrog" or "block"
+        self.seed = seed  # For reproducibility
+        self.trajectory_file = trajectory_file  # Frames are streamed here during the run
+        self.checkpoint_file = checkpoint_file  # Periodic restart file (None = no checkpoints)
+        self.checkpoint_interval = checkpoint_interval  # Seconds between checkpoints
+        self.precision = precision  # "double", "mixed" or "single" (see PRECISIONS)
+
+    def physics(self):
+        """The parameters a checkpoint must match to be resumed.
+
+        Not the run length, nor `workers`: the parallel forces are
+        bit-for-bit the serial ones, so a restart may change either.
+        """
+        return {key: getattr(self, key) for key in ("num_particles", "G", "time_step", "softening",
+                                                    "backend", "theta", "integrator", "seed",
+                                                    "precision")}
+
+    def __repr__(self):
+        fields = ", ".join(f"{key}={value!r}" for key, value in vars(self).items())
+        return f"GalaxyConfig({fields})"
+
+
+def initial_conditions(config):
+    """Random positions, velocities, masses and star sizes.
+
+    The draws are the same, in the same order, as the scripts' global
+    `np.random.seed(config.seed)` sequence, without touching global state.
+    """
+    rng = np.random.RandomState(config.seed)
+    n = config.num_particles
+    positions = rng.uniform(-5, 5, (n, 3))  # Random 3D positions
+    velocities = rng.uniform(-0.5, 0.5, (n, 3))  # Random velocities
+    masses = rng.uniform(0.5, 1.5, n)  # Random masses
+    sizes = rng.uniform(3, 10, n)  # Star sizes (3 to 10), used by the "sizes" style
+    return positions, velocities, masses, sizes
+
+
+class SimulationResult:
+    """Outcome of `simulate`.
+
+    `trajectory` is the lazily memory-mapped (frames, N, 3) array of
+    positions; `energy_drift` the relative change of the total energy.
+    """
+
+    def __init__(self, config, trajectory, masses, sizes, energy_drift, force_evaluations,
+                 seconds):
+        self.config = config
+        self.trajectory = trajectory
+        self.masses = masses
+        self.sizes = sizes
+        self.energy_drift = energy_drift
+        self.force_evaluations = force_evaluations
+        self.seconds = seconds
+
+    def summary(self):
+        config = self.config
+        return (f"{config.num_particles} stars x {config.num_steps} steps "
+                f"({config.backend}, {config.integrator}, {config.precision}) "
+                f"in {self.seconds:.2f}s: "
+                f"relative energy drift {self.energy_drift:.2e} after "
+                f"{self.force_evaluations} particle force evaluations")
+
+
+def simulate(config, restart=False):
+    """Integrate the galaxy described by `config` and return a `SimulationResult`.
+
+    With `restart`, the state in `config.checkpoint_file` is loaded and the
+    run continues from its step; the trajectory is truncated to match.
+    """
+    force_dtype, state_dtype, trajectory_dtype = PRECISIONS[config.precision]
+    positions, velocities, masses, sizes = initial_conditions(config)
+    positions = positions.astype(state_dtype, copy=False)
+    velocities = velocities.astype(state_dtype, copy=False)
+
+    # Gravitational force backend and time integrator
+    force = make_force_backend(config.backend, config.G, config.softening, theta=config.theta,
+                               workers=config.workers, dtype=force_dtype)
+    integrator = make_integrator(config.integrator, force, config.time_step,
+                                 softening=config.softening)
+    initial_energy = total_energy(positions, velocities, masses, config.G, config.softening)
+    first_step, elapsed = 0, 0.0
+    checkpointer = None
+    if config.checkpoint_file is not None:
+        checkpointer = Checkpointer(config.checkpoint_file, config.checkpoint_interval)
+    if restart:
+        if checkpointer is None or not checkpointer.exists():
+            raise ValueError("Restart requested but there is no checkpoint file to resume from")
+        arrays, state = checkpointer.load()
+        check_parameters(state, config.physics())
+        positions, velocities = arrays.pop("positions"), arrays.pop("velocities")
+        masses = arrays.pop("masses")
+        restore_integrator(integrator, arrays, state["force_evaluations"])
+        first_step, elapsed = state["step"], state["seconds"]
+        initial_energy = state["initial_energy"]
+
+    # Simulation loop, streaming positions to disk
+    start = time.perf_counter()
+    resume_frames = first_step + 1 if restart else None
+    with TrajectoryWriter(config.trajectory_file, config.num_particles, dtype=trajectory_dtype,
+                          resume_frames=resume_frames) as trajectory:
+        if not restart:
+            trajectory.append(positions)
+        for step in range(first_step, config.num_steps):
+            with stats.timer("galaxy.step"):  # Force evaluation plus integration
+                integrator.step(positions, velocities, masses)
+            with stats.timer("galaxy.record"):
+                trajectory.append(positions)
+            if checkpointer is not None and checkpointer.due():
+                trajectory.flush()  # Frames up to the checkpoint are on disk
+                state = {
+                    "parameters": config.physics(),
+                    "step": step + 1,
+                    "force_evaluations": integrator.force_evaluations,
+                    "initial_energy": initial_energy,
+                    "seconds": elapsed + time.perf_counter() - start,
+                }
+                with stats.timer("galaxy.checkpoint"):
+                    checkpointer.save(dict(integrator_state(integrator), positions=positions,
+                                           velocities=velocities, masses=masses), state)
+    seconds = elapsed + time.perf_counter() - start
+    stats.count("galaxy.steps", config.num_steps - first_step)
+    stats.count("galaxy.force_evaluations", integrator.force_evaluations)
+    if hasattr(force, "close"):
+        force.close()
+
+    drift = total_energy(positions, velocities, masses, config.G, config.softening) / initial_energy - 1
+    return SimulationResult(config, open_trajectory(config.trajectory_file), masses, sizes, drift,
+                            integrator.force_evaluations, seconds)
+
+
+def precision_report(num_particles=1000, num_steps=200, integrator="leapfrog", time_step=0.01,
+                     precisions=tuple(PRECISIONS), seed=42):
+    """Energy drift, speed and trajectory size of one run per precision.
+
+    Every run starts from the same initial conditions. `position_error` is
+    the largest final position difference from the "double" run (N-body
+    orbits are chaotic, so it grows with run length whatever the precision).
+    """
+    rows, reference = [], None
+    with tempfile.TemporaryDirectory() as directory:
+        for precision in ("double",) + tuple(p for p in precisions if p != "double"):
+            path = os.path.join(directory, f"{precision}.npy")
+            config = GalaxyConfig(num_particles=num_particles, num_steps=num_steps,
+                                  time_step=time_step, integrator=integrator, seed=seed,
+                                  trajectory_file=path, precision=precision)
+            result = simulate(config)
+            final = np.array(result.trajectory[-1], dtype=float)
+            if reference is None:
+                reference = final
+            if precision in precisions:
+                rows.append({
+                    "precision": precision,
+                    "energy_drift": float(result.energy_drift),
+                    "position_error": float(np.abs(final - reference).max()),
+                    "seconds": result.seconds,
+                    "trajectory_bytes": os.path.getsize(path),
+                })
+            del result  # Release the trajectory map before the directory goes
+    return rows
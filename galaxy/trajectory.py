@@ -0,0 +1,86 @@
+import struct
+
+import numpy as np
+
+CHUNK_FRAMES = 32  # Frames buffered in RAM before each write
+HEADER_BYTES = 128  # Fixed .npy header size so it can be rewritten in place
+_MAGIC = b"\x93NUMPY\x01\x00"
+
+
+def _npy_header(shape, dtype):
+    """Return a version 1.0 .npy header padded to exactly HEADER_BYTES."""
+    text = repr({"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                 "fortran_order": False, "shape": tuple(shape)})
+    padding = HEADER_BYTES - len(_MAGIC) - 2 - len(text) - 1
+    if padding < 0:
+        raise ValueError(f"Trajectory shape {shape} does not fit in the .npy header")
+    body = (text + " " * padding + "\n").encode("latin1")
+    return _MAGIC + struct.pack("<H", len(body)) + body
+
+
+class TrajectoryWriter:
+    """Stream (N, 3) frames to a .npy file as the simulation runs.
+
+    Only `chunk_frames` frames are held in memory; full chunks are appended
+    to the file and the header's frame count is patched on every flush, so
+    the file on disk is always a valid .npy array of the frames written so
+    far. Read it back lazily with `open_trajectory`.
+
+    With `resume_frames`, an existing trajectory is reopened and truncated
+    to its first `resume_frames` frames, so a restarted run appends where
+    its checkpoint was taken.
+    """
+
+    def __init__(self, path, num_particles, dtype=float, chunk_frames=CHUNK_FRAMES,
+                 resume_frames=None):
+        self.path = path
+        self.num_particles = num_particles
+        self.dtype = np.dtype(dtype)
+        self.frames = 0
+        self._buffer = np.empty((chunk_frames, num_particles, 3), dtype=self.dtype)
+        self._pending = 0
+        if resume_frames is None:
+            self._file = open(path, "wb")
+            self._file.write(_npy_header((0, num_particles, 3), self.dtype))
+        else:
+            self._file = open(path, "r+b")
+            frame_bytes = num_particles * 3 * self.dtype.itemsize
+            if self._file.seek(0, 2) < HEADER_BYTES + resume_frames * frame_bytes:
+                raise ValueError(f"{path} holds fewer than {resume_frames} frames")
+            self._file.truncate(HEADER_BYTES + resume_frames * frame_bytes)
+            self.frames = resume_frames
+            self.flush()
+
+    def append(self, positions):
+        """Copy one frame of positions into the write buffer."""
+        self._buffer[self._pending] = positions
+        self._pending += 1
+        if self._pending == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        """Write buffered frames and update the frame count in the header."""
+        if self._pending:
+            self._file.seek(0, 2)
+            self._file.write(self._buffer[:self._pending].tobytes())
+            self.frames += self._pending
+            self._pending = 0
+        self._file.seek(0)
+        self._file.write(_npy_header((self.frames, self.num_particles, 3), self.dtype))
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_trajectory(path):
+    """Memory-map a trajectory read-only; frames load on first access."""
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,118 @@
+"""Stochastic kinetics of the Haber process, N2 + 3 H2 <=> 2 NH3.
+
+Many independent trajectories are advanced together in NumPy arrays, either
+with Gillespie's exact stochastic simulation algorithm (SSA) or with
+tau-leaping, and recorded on a common time grid so that mean and quantile
+curves can be taken across trajectories. Propensities follow mass action:
+
+    forward: k_forward * N2 * C(H2, 3)
+    reverse: k_reverse * C(NH3, 2)
+"""
+import time
+
+import numpy as np
+
+from instrumentation import stats
+
+SPECIES = ("N2", "H2", "NH3")
+STOICHIOMETRY = np.array([[-1, -3, 2],   # N2 + 3 H2 -> 2 NH3
+                          [1, 3, -2]])   # 2 NH3 -> N2 + 3 H2
+
+
+def propensities(state, k_forward, k_reverse):
+    """(..., 2) forward and reverse propensities for (..., 3) molecule counts."""
+    n2, h2, nh3 = (state[..., i].astype(float) for i in range(3))
+    forward = k_forward * n2 * h2 * (h2 - 1) * (h2 - 2) / 6
+    reverse = k_reverse * nh3 * (nh3 - 1) / 2
+    return np.stack([forward, reverse], axis=-1)
+
+
+def _initial(initial, num_trajectories):
+    state = np.empty((num_trajectories, 3), dtype=np.int64)
+    state[:] = initial
+    return state
+
+
+def simulate_ssa(initial, k_forward, k_reverse, t_end, num_points, num_trajectories, rng=None):
+    """Exact SSA for `num_trajectories` independent runs.
+
+    Returns `(times, counts)` where `times` is the (G,) recording grid over
+    [0, t_end] and `counts[m, g]` the (N2, H2, NH3) state of trajectory m at
+    `times[g]`.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    begin = time.perf_counter()
+    times = np.linspace(0, t_end, num_points)
+    state = _initial(initial, num_trajectories)
+    counts = np.empty((num_trajectories, num_points, 3), dtype=np.int64)
+    reactions = 0
+    clock = np.zeros(num_trajectories)
+    next_point = np.zeros(num_trajectories, dtype=np.int64)  # First unrecorded grid point
+    active = np.arange(num_trajectories)
+
+    while len(active):
+        a = propensities(state[active], k_forward, k_reverse)
+        total = a.sum(axis=1)
+        with np.errstate(divide="ignore"):
+            wait = rng.exponential(1.0, len(active)) / total  # inf once no reaction can fire
+        new_clock = clock[active] + wait
+
+        # Record the current state at every grid point passed before the jump
+        pending = np.ones(len(active), dtype=bool)
+        while pending.any():
+            rows = active[pending]
+            ready = times[np.minimum(next_point[rows], num_points - 1)] < new_clock[pending]
+            ready &= next_point[rows] < num_points
+            rows = rows[ready]
+            counts[rows, next_point[rows]] = state[rows]
+            next_point[rows] += 1
+            pending[np.flatnonzero(pending)[~ready]] = False
+
+        # Fire one reaction in every trajectory that is still inside the horizon
+        firing = new_clock <= t_end
+        rows = active[firing]
+        reverse = rng.random(len(rows)) * total[firing] >= a[firing, 0]
+        state[rows] += STOICHIOMETRY[reverse.astype(np.int64)]
+        clock[rows] = new_clock[firing]
+        active = rows
+        reactions += len(rows)
+    stats.add_time("haber.ssa", time.perf_counter() - begin)
+    stats.count("haber.trajectories", num_trajectories)
+    stats.count("haber.reactions", reactions)
+    return times, counts
+
+
+def simulate_tau_leap(initial, k_forward, k_reverse, t_end, num_points, num_trajectories,
+                      leaps_per_point=10, rng=None):
+    """Tau-leaping with `leaps_per_point` leaps between recording points.
+
+    Firing counts are Poisson with mean a_j * tau. The forward count is then
+    capped by the available N2 and H2, and the reverse count by the NH3
+    present after the forward firings, so populations never go negative.
+    The result has the same layout as `simulate_ssa`.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    begin = time.perf_counter()
+    times = np.linspace(0, t_end, num_points)
+    tau = (times[1] - times[0]) / leaps_per_point if num_points > 1 else 0.0
+    state = _initial(initial, num_trajectories)
+    counts = np.empty((num_trajectories, num_points, 3), dtype=np.int64)
+    counts[:, 0] = state
+
+    for point in range(1, num_points):
+        for _ in range(leaps_per_point):
+            a = propensities(state, k_forward, k_reverse)
+            fired = rng.poisson(a * tau)
+            forward = np.minimum(fired[:, 0], np.minimum(state[:, 0], state[:, 1] // 3))
+            state += forward[:, None] * STOICHIOMETRY[0]
+            reverse = np.minimum(fired[:, 1], state[:, 2] // 2)
+            state += reverse[:, None] * STOICHIOMETRY[1]
+        counts[:, point] = state
+    stats.add_time("haber.tau_leap", time.perf_counter() - begin)
+    stats.count("haber.trajectories", num_trajectories)
+    return times, counts
+
+
+def summarize(counts, quantiles=(0.05, 0.5, 0.95)):
+    """Mean (G, 3) and quantile (Q, G, 3) curves across trajectories."""
+    return counts.mean(axis=0), np.quantile(counts, quantiles, axis=0)
@@ -1,41 +1,51 @@
-import numpy as np
 import matplotlib.pyplot as plt
-import random
+from math import comb
+
+from haber_kinetics import simulate_ssa, simulate_tau_leap, summarize
+from rng_streams import make_rng
 
 # Initial conditions
 num_N2 = 50  # Number of N2 molecules
 num_H2 = 150  # Number of H2 molecules
 num_NH3 = 0   # Initial number of NH3 molecules
 
-reaction_rate = 0.05  # Probability of a successful reaction per step
-time_steps = 200      # Total number of simulation steps
-
-# Track molecule counts over time
-N2_counts = []
-H2_counts = []
-NH3_counts = []
-
-# Simulation loop
-for t in range(time_steps):
-    N2_counts.append(num_N2)
-    H2_counts.append(num_H2)
-    NH3_counts.append(num_NH3)
-    
-    # Attempt reactions
-    if num_N2 > 0 and num_H2 >= 3:  # Check if enough molecules are available
-        if random.random() < reaction_rate:  # Reaction occurs probabilistically
-            num_N2 -= 1  # One N2 molecule is consumed
-            num_H2 -= 3  # Three H2 molecules are consumed
-            num_NH3 += 2  # Two NH3 molecules are produced
+reaction_rate = 0.05  # Initial forward reactions per time step
+time_steps = 200      # Simulated time horizon (in steps)
+
+# Mass-action rate constants; the forward one reproduces reaction_rate at t = 0
+forward_rate_constant = reaction_rate / (num_N2 * comb(num_H2, 3))  # N2 + 3 H2 -> 2 NH3
+reverse_rate_constant = 1e-4  # 2 NH3 -> N2 + 3 H2 (0 disables the reverse reaction)
+
+num_trajectories = 1000  # Independent stochastic runs, simulated together
+method = "ssa"  # "ssa" (exact Gillespie) or "tau-leap" (approximate, faster for large counts)
+leaps_per_step = 1  # Tau-leaping steps per time step
+seed = 42  # For reproducibility
+
+# Simulate all trajectories on a common time grid
+rng = make_rng(seed)
+initial = (num_N2, num_H2, num_NH3)
+if method == "ssa":
+    times, counts = simulate_ssa(initial, forward_rate_constant, reverse_rate_constant,
+                                 time_steps, time_steps + 1, num_trajectories, rng)
+else:
+    times, counts = simulate_tau_leap(initial, forward_rate_constant, reverse_rate_constant,
+                                      time_steps, time_steps + 1, num_trajectories,
+                                      leaps_per_step, rng)
+
+# Mean and 5%-95% quantile curves across trajectories
+mean_counts, quantile_counts = summarize(counts, quantiles=(0.05, 0.95))
+N2_counts, H2_counts, NH3_counts = mean_counts.T
 
 # Plot the results
 plt.figure(figsize=(10, 6))
-plt.plot(N2_counts, label="N₂ (Nitrogen)", color="blue")
-plt.plot(H2_counts, label="H₂ (Hydrogen)", color="red")
-plt.plot(NH3_counts, label="NH₃ (Ammonia)", color="green")
+for i, (label, color) in enumerate([("N₂ (Nitrogen)", "blue"), ("H₂ (Hydrogen)", "red"),
+                                    ("NH₃ (Ammonia)", "green")]):
+    plt.plot(times, mean_counts[:, i], label=label, color=color)
+    plt.fill_between(times, quantile_counts[0, :, i], quantile_counts[1, :, i], color=color,
+                     alpha=0.2)
 plt.xlabel("Time Steps")
 plt.ylabel("Number of Molecules")
-plt.title("Haber Process Simulation")
+plt.title(f"Haber Process Simulation (mean and 5-95% band of {num_trajectories} runs)")
 plt.legend()
 plt.grid()
 plt.show()
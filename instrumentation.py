@@ -0,0 +1,128 @@
+"""Lightweight run instrumentation: scoped timers, counters and rates.
+
+The simulations record into the shared `stats` object:
+
+    with stats.timer("galaxy.force"):
+        ...
+    stats.count("docking.move.accepted", accepted)
+
+Instrumentation is off unless the SIM_PROFILE environment variable names
+an output file, e.g. `SIM_PROFILE=astro_profile.json python astro.py`.
+When it is off, `timer` returns a shared no-op context manager and `count`
+and `add_time` are no-op functions, so a disabled call costs one Python
+call. When it is on, the summary is written at exit as JSON, or as CSV if
+the file name ends in .csv. Counter pairs named `<x>.accepted` and
+`<x>.proposed` are also reported as the rate `<x>.acceptance`.
+"""
+import atexit
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+
+PROFILE_VARIABLE = "SIM_PROFILE"  # Environment variable naming the summary file
+_NULL_TIMER = contextlib.nullcontext()
+
+
+class _Timer:
+    __slots__ = ("_totals", "_name", "_start")
+
+    def __init__(self, totals, name):
+        self._totals = totals
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._start
+        entry = self._totals.get(self._name)
+        if entry is None:
+            self._totals[self._name] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+
+def _ignore(name, amount=1):
+    pass
+
+
+class Instrumentation:
+    """Accumulates named timers and counters; see the module docstring."""
+
+    def __init__(self, enabled=False):
+        self.timers = {}  # name -> [calls, seconds]
+        self.counters = {}  # name -> total
+        self.started = time.perf_counter()
+        self.enabled = enabled
+        if not enabled:
+            self.count = _ignore
+            self.add_time = _ignore
+
+    def timer(self, name):
+        """Context manager adding the wall time of its block to timer `name`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.timers, name)
+
+    def add_time(self, name, seconds):
+        """Add one call of `seconds` to timer `name`, for code timed by hand."""
+        entry = self.timers.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def count(self, name, amount=1):
+        """Add `amount` to counter `name` (replaced by a no-op when disabled)."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def rates(self):
+        """`<x>.acceptance` = accepted / proposed for every matching counter pair."""
+        rates = {}
+        for name, proposed in self.counters.items():
+            if name.endswith(".proposed") and proposed:
+                prefix = name[:-len(".proposed")]
+                rates[prefix + ".acceptance"] = self.counters.get(prefix + ".accepted", 0) / proposed
+        return rates
+
+    def summary(self):
+        return {
+            "script": os.path.basename(sys.argv[0]) if sys.argv else "",
+            "wall_seconds": time.perf_counter() - self.started,
+            "timers": {name: {"calls": calls, "seconds": seconds, "mean_seconds": seconds / calls}
+                       for name, (calls, seconds) in sorted(self.timers.items())},
+            "counters": dict(sorted(self.counters.items())),
+            "rates": dict(sorted(self.rates().items())),
+        }
+
+    def dump(self, path):
+        """Write the summary to `path` (CSV for .csv, JSON otherwise)."""
+        summary = self.summary()
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as handle:
+                writer = csv.writer(handle)
+                writer.writerow(["kind", "name", "calls", "value"])
+                writer.writerow(["wall", "total", "", summary["wall_seconds"]])
+                for name, entry in summary["timers"].items():
+                    writer.writerow(["timer", name, entry["calls"], entry["seconds"]])
+                for name, value in summary["counters"].items():
+                    writer.writerow(["counter", name, "", value])
+                for name, value in summary["rates"].items():
+                    writer.writerow(["rate", name, "", value])
+        else:
+            with open(path, "w") as handle:
+                json.dump(summary, handle, indent=2)
+
+
+def _from_environment():
+    path = os.environ.get(PROFILE_VARIABLE)
+    instrumentation = Instrumentation(enabled=bool(path))
+    if path:
+        atexit.register(instrumentation.dump, path)
+    return instrumentation
+
+
+stats = _from_environment()
@@ -0,0 +1,143 @@
+"""Lattice protein chain with an occupancy map for O(1) Metropolis updates.
+
+The folding scripts score a chain by its overlaps, energy = length - number
+of distinct sites. Keeping a site -> monomer-count map makes the energy
+change of a single-monomer move a two-lookup operation, and moves are
+applied in place, so rejected proposals cost no copies at all.
+"""
+import numpy as np
+
+from instrumentation import stats
+
+
+class LatticeChain:
+    """A chain of integer lattice sites (2D or 3D) with incremental energy.
+
+    Sites are stored as tuples; when `grid_size` is given, proposed sites are
+    wrapped periodically. The chain supports `len`, indexing and iteration
+    like the list of tuples the scripts used before.
+    """
+
+    def __init__(self, sites, grid_size=None):
+        self.sites = [tuple(int(c) for c in site) for site in sites]
+        self.grid_size = grid_size
+        self.occupancy = {}
+        for site in self.sites:
+            self.occupancy[site] = self.occupancy.get(site, 0) + 1
+        self.energy = len(self.sites) - len(self.occupancy)
+        self.moves = 0  # Accepted moves, for acceptance rates
+
+    def __len__(self):
+        return len(self.sites)
+
+    def __getitem__(self, index):
+        return self.sites[index]
+
+    def __iter__(self):
+        return iter(self.sites)
+
+    def wrap(self, site):
+        """Apply periodic boundary conditions, if any."""
+        if self.grid_size is None:
+            return site
+        return tuple(c % self.grid_size for c in site)
+
+    def energy_delta(self, index, new_site):
+        """Energy change if monomer `index` moved to `new_site`, in O(1)."""
+        old_site = self.sites[index]
+        if new_site == old_site:
+            return 0
+        leaving = 1 if self.occupancy[old_site] > 1 else 0  # Removes one overlap
+        arriving = 1 if new_site in self.occupancy else 0  # Creates one overlap
+        return arriving - leaving
+
+    def move(self, index, new_site, delta=None):
+        """Move monomer `index` to `new_site` in place and update the energy."""
+        if delta is None:
+            delta = self.energy_delta(index, new_site)
+        old_site = self.sites[index]
+        count = self.occupancy[old_site]
+        if count == 1:
+            del self.occupancy[old_site]
+        else:
+            self.occupancy[old_site] = count - 1
+        self.occupancy[new_site] = self.occupancy.get(new_site, 0) + 1
+        self.sites[index] = new_site
+        self.energy += delta
+        self.moves += 1
+
+    def full_energy(self):
+        """Recompute the energy from scratch (for checking the running value)."""
+        return len(self.sites) - len(set(self.sites))
+
+    def to_array(self):
+        """Sites as an (L, d) integer array, e.g. for plotting."""
+        return np.array(self.sites)
+
+
+def run_chain(chain, step, num_steps, snapshot_every=1):
+    """Advance `chain` by `num_steps` calls of `step(chain) -> chain`, headless.
+
+    Every `snapshot_every` steps the sites and energy are copied into
+    preallocated arrays, which are returned as `(snapshots, energies)` with
+    shapes (S, L, d) and (S,); snapshot 0 is the starting state. Nothing is
+    drawn, so this runs at full speed without a display.
+    """
+    if snapshot_every < 1:
+        raise ValueError("snapshot_every must be at least 1")
+    count = num_steps // snapshot_every + 1
+    moves_before = chain.moves
+    snapshots = np.empty((count, len(chain), len(chain[0])), dtype=np.int64)
+    energies = np.empty(count, dtype=np.int64)
+    snapshots[0], energies[0] = chain.sites, chain.energy
+    for k in range(1, count):
+        for _ in range(snapshot_every):
+            chain = step(chain)
+        snapshots[k], energies[k] = chain.sites, chain.energy
+    for _ in range(num_steps % snapshot_every):
+        chain = step(chain)
+    stats.count("folding.move.proposed", num_steps)
+    stats.count("folding.move.accepted", chain.moves - moves_before)
+    return snapshots, energies
+
+
+MOVES_2D = ((0, 1), (0, -1), (1, 0), (-1, 0))  # Up, down, right, left
+
+
+def metropolis_step_2d(chain, rng, temperature=1.0):
+    """One Metropolis move of the 2D folding script (Nuclear-Reaction.py).
+
+    A random interior monomer tries a unit step up, down, left or right,
+    wrapped periodically by the chain. `rng` is a `rng_streams.RandomBlock`.
+    Returns the chain, so it can be passed to `run_chain`.
+    """
+    # Select a random amino acid (not the first or last)
+    index = rng.randint(1, len(chain) - 2)
+    dx, dy = rng.choice(MOVES_2D)
+    x, y = chain[index]
+    new_site = chain.wrap((x + dx, y + dy))
+
+    # Accept move with Metropolis criterion, in place
+    delta = chain.energy_delta(index, new_site)
+    if delta <= 0 or rng.random() < np.exp(-delta / temperature):
+        chain.move(index, new_site, delta)
+    return chain
+
+
+def metropolis_step_3d(chain, rng, temperature=1.0):
+    """One Metropolis move of the 3D folding script (protein folding.py).
+
+    A random interior monomer tries a diagonal step of +-1 on every axis.
+    `rng` is a `rng_streams.RandomBlock`.
+    """
+    # Select a random amino acid (not the first or last)
+    index = rng.randint(1, len(chain) - 2)
+    x, y, z = chain[index]
+    new_site = chain.wrap((x + rng.choice((-1, 1)), y + rng.choice((-1, 1)),
+                           z + rng.choice((-1, 1))))
+
+    # Accept move with Metropolis criterion, in place
+    delta = chain.energy_delta(index, new_site)
+    if delta <= 0 or rng.random() < np.exp(-delta / temperature):
+        chain.move(index, new_site, delta)
+    return chain
@@ -0,0 +1,321 @@
+"""Event-based, vectorised neutron transport for Nut-Sim.py.
+
+The recursive `simulate_neutron` followed one neutron at a time and
+recursed on every fission. Here all live neutrons sit in a particle bank of
+NumPy arrays, and every pass of the loop moves each of them through one
+flight and one collision. Fission progeny are appended to the bank instead
+of being simulated recursively, so there is no recursion limit. The physics
+follows the original exactly:
+
+* neutrons are born uniformly in the square medium;
+* each flight has an exponential length and an isotropic 2D direction;
+* after every flight a collision type is drawn, even if the flight left
+  the medium. Absorption and fission are counted wherever they happen
+  (the mesh tallies score only those inside); a scattered neutron
+  continues only while it is inside the medium;
+* a fission produces two new neutrons, born uniformly in the medium.
+
+Both `transport` and `criticality` accept a `checkpoint.Checkpointer`. The
+tallies, counters and generator state are then saved atomically between
+batches (or generations), and `restart=True` continues bit for bit from
+the last checkpoint.
+"""
+import time
+
+import numpy as np
+
+from checkpoint import check_parameters, restore_rng, rng_state
+from instrumentation import stats
+
+BATCH_SIZE = 100_000  # Source neutrons started together; bounds bank memory
+MESH_BINS = 100  # Tally mesh cells per side
+
+
+class MeshTally:
+    """Flux, absorption and fission densities on a regular mesh over the medium.
+
+    Events are binned with one `np.bincount` per batch, so memory is fixed by
+    the mesh size rather than by the number of events. Flux uses the
+    collision estimator: each collision inside the medium scores one mean
+    free path. Events outside the medium are not scored.
+    """
+
+    def __init__(self, medium_size, bins=MESH_BINS):
+        self.medium_size = medium_size
+        self.bins = bins
+        self.flux = np.zeros(bins * bins)
+        self.absorption = np.zeros(bins * bins)
+        self.fission = np.zeros(bins * bins)
+
+    def _cells(self, x, y):
+        inside = (x >= 0) & (x <= self.medium_size) & (y >= 0) & (y <= self.medium_size)
+        scale = self.bins / self.medium_size
+        ix = np.minimum((x[inside] * scale).astype(np.int64), self.bins - 1)
+        iy = np.minimum((y[inside] * scale).astype(np.int64), self.bins - 1)
+        return iy * self.bins + ix  # Row-major (y, x), ready for imshow
+
+    def score(self, tally, x, y, weight=1.0):
+        tally += weight * np.bincount(self._cells(x, y), minlength=self.bins * self.bins)
+
+    def density(self, tally, per=1):
+        """A tally as a (bins, bins) image, per unit area and per `per` source neutrons."""
+        cell_area = (self.medium_size / self.bins) ** 2
+        return tally.reshape(self.bins, self.bins) / (cell_area * per)
+
+
+class TransportResult:
+    """Tallies of a transport run.
+
+    `mesh` holds the spatial tallies (see `MeshTally`). If tracks were
+    recorded, `tracks` is an (F, 4) array of flight segments
+    (x0, y0, x1, y1) from the sampled histories.
+    """
+
+    def __init__(self, mesh, absorbed, fissions, histories, collisions, leaked, tracks=None):
+        self.mesh = mesh
+        self.absorbed = absorbed
+        self.fissions = fissions
+        self.histories = histories
+        self.collisions = collisions
+        self.leaked = leaked
+        self.tracks = tracks
+
+    def summary(self):
+        return (f"{self.histories} neutron histories: {self.absorbed} absorbed, "
+                f"{self.fissions} fissions, {self.leaked} leaked, "
+                f"{self.collisions} collisions")
+
+
+def transport(num_neutrons, medium_size, mean_free_path, scatter_prob, absorption_prob,
+              fission_prob, rng=None, mesh_bins=MESH_BINS, track_fraction=0.0,
+              max_track_segments=10_000, batch_size=BATCH_SIZE, checkpoint=None, restart=False):
+    """Transport `num_neutrons` source neutrons and all their fission progeny.
+
+    Each history (source or fission-born) is tracked with probability
+    `track_fraction`; at most `max_track_segments` segments are kept. With a
+    `checkpoint`, state is saved between batches whenever it is due.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    total = scatter_prob + absorption_prob + fission_prob
+    scatter_cut = scatter_prob / total
+    absorb_cut = (scatter_prob + absorption_prob) / total
+    parameters = [num_neutrons, medium_size, mean_free_path, scatter_prob, absorption_prob,
+                  fission_prob, mesh_bins, track_fraction, max_track_segments, batch_size]
+
+    begin = time.perf_counter()
+    mesh = MeshTally(medium_size, mesh_bins)
+    tracks = []
+    kept_segments = 0
+    histories = collisions = absorbed = fissions = leaked = 0
+    first = 0
+    if restart:
+        if checkpoint is None or not checkpoint.exists():
+            raise ValueError("Restart requested but there is no checkpoint file to resume from")
+        arrays, state = checkpoint.load()
+        check_parameters(state, parameters)
+        mesh.flux, mesh.absorption, mesh.fission = (arrays["flux"], arrays["absorption"],
+                                                    arrays["fission"])
+        tracks = [arrays["tracks"]]
+        kept_segments = len(arrays["tracks"])
+        histories, collisions, absorbed, fissions, leaked = state["counts"]
+        first = state["next_start"]
+        restore_rng(rng, state["rng"])
+
+    for start in range(first, num_neutrons, batch_size):
+        if checkpoint is not None and start > first and checkpoint.due():
+            tracks = [np.concatenate(tracks)] if tracks else [np.empty((0, 4))]
+            checkpoint.save(
+                {"flux": mesh.flux, "absorption": mesh.absorption, "fission": mesh.fission,
+                 "tracks": tracks[0]},
+                {"parameters": parameters, "next_start": start, "rng": rng_state(rng),
+                 "counts": [histories, collisions, absorbed, fissions, leaked]})
+        count = min(batch_size, num_neutrons - start)
+        x = rng.uniform(0, medium_size, count)
+        y = rng.uniform(0, medium_size, count)
+        tracked = rng.random(count) < track_fraction
+        histories += count
+        while len(x):
+            # Sample distance to next interaction and a random direction
+            distance = rng.exponential(mean_free_path, len(x))
+            angle = rng.uniform(0, 2 * np.pi, len(x))
+            new_x = x + np.cos(angle) * distance
+            new_y = y + np.sin(angle) * distance
+            if kept_segments < max_track_segments and tracked.any():
+                segments = np.column_stack([x, y, new_x, new_y])[tracked]
+                segments = segments[:max_track_segments - kept_segments]
+                tracks.append(segments)
+                kept_segments += len(segments)
+            collisions += len(x)
+            mesh.score(mesh.flux, new_x, new_y, mean_free_path)
+
+            # Determine interaction type
+            u = rng.random(len(x))
+            absorb = (u >= scatter_cut) & (u < absorb_cut)
+            split = u >= absorb_cut
+            mesh.score(mesh.absorption, new_x[absorb], new_y[absorb])
+            mesh.score(mesh.fission, new_x[split], new_y[split])
+            absorbed += int(np.count_nonzero(absorb))
+
+            # Scattered neutrons continue while inside the medium
+            inside = (new_x >= 0) & (new_x <= medium_size) & (new_y >= 0) & (new_y <= medium_size)
+            survive = (u < scatter_cut) & inside
+            leaked += int(np.count_nonzero((u < scatter_cut) & ~inside))
+
+            # Each fission spawns two new neutrons
+            born = 2 * int(np.count_nonzero(split))
+            fissions += born // 2
+            histories += born
+            x = np.concatenate([new_x[survive], rng.uniform(0, medium_size, born)])
+            y = np.concatenate([new_y[survive], rng.uniform(0, medium_size, born)])
+            tracked = np.concatenate([tracked[survive], rng.random(born) < track_fraction])
+
+    stats.add_time("transport.run", time.perf_counter() - begin)
+    for name, value in [("histories", histories), ("collisions", collisions),
+                        ("absorbed", absorbed), ("fissions", fissions), ("leaked", leaked)]:
+        stats.count(f"transport.{name}", value)
+    return TransportResult(mesh, absorbed, fissions, histories, collisions, leaked,
+                           np.concatenate(tracks) if tracks else np.empty((0, 4)))
+
+
+class CriticalityResult:
+    """Outcome of `criticality`.
+
+    `k_generations` holds the k estimate of every generation (inactive ones
+    first); `k_mean`, `k_std_err` and `ci_half_width` summarise the active
+    generations, and `ci_history` holds the half-width after each of them.
+    """
+
+    def __init__(self, k_generations, inactive, ci_history, confidence_z, converged):
+        self.k_generations = k_generations
+        self.inactive = inactive
+        self.ci_history = ci_history
+        self.confidence_z = confidence_z
+        self.converged = converged
+
+    @property
+    def active(self):
+        return self.k_generations[self.inactive:]
+
+    @property
+    def k_mean(self):
+        return float(self.active.mean()) if len(self.active) else float("nan")
+
+    @property
+    def k_std_err(self):
+        n = len(self.active)
+        return float(self.active.std(ddof=1) / np.sqrt(n)) if n > 1 else float("inf")
+
+    @property
+    def ci_half_width(self):
+        return self.confidence_z * self.k_std_err
+
+    def summary(self):
+        state = "converged" if self.converged else "not converged"
+        return (f"k-eff = {self.k_mean:.5f} +/- {self.ci_half_width:.5f} "
+                f"({len(self.active)} active + {self.inactive} inactive generations, {state})")
+
+
+def _run_generation(x, y, medium_size, mean_free_path, scatter_cut, absorb_cut, bank_x, bank_y,
+                    rng):
+    """Transport one generation; fission sites are written into the bank.
+
+    Returns the number of fission sites banked. A flight that leaves the
+    medium leaks before colliding, so every banked site lies inside it.
+    """
+    sites = 0
+    while len(x):
+        distance = rng.exponential(mean_free_path, len(x))
+        angle = rng.uniform(0, 2 * np.pi, len(x))
+        x = x + np.cos(angle) * distance
+        y = y + np.sin(angle) * distance
+        inside = (x >= 0) & (x <= medium_size) & (y >= 0) & (y <= medium_size)
+        x, y = x[inside], y[inside]
+
+        u = rng.random(len(x))
+        split = u >= absorb_cut
+        count = int(np.count_nonzero(split))
+        bank_x[sites:sites + count] = x[split]
+        bank_y[sites:sites + count] = y[split]
+        sites += count
+
+        scatter = u < scatter_cut
+        x, y = x[scatter], y[scatter]
+    return sites
+
+
+def criticality(num_neutrons, medium_size, mean_free_path, scatter_prob, absorption_prob,
+                fission_prob, nu=2.0, inactive=10, max_active=200, min_active=10,
+                tolerance=None, confidence_z=1.96, rng=None, callback=None, checkpoint=None,
+                restart=False):
+    """Estimate k-effective by power iteration over fixed-size generations.
+
+    Every generation starts exactly `num_neutrons` neutrons from the source
+    bank and stores their fission sites in a preallocated bank (each neutron
+    ends in at most one fission, so the bank never holds more than
+    `num_neutrons` sites). The generation's estimate is
+    k = nu * sites / num_neutrons, and the next source is resampled from the
+    banked sites back to `num_neutrons`, so memory and work per generation
+    are fixed. The first `inactive` generations only converge the source.
+    With a `tolerance`, the run stops once at least `min_active` active
+    generations have been run and the confidence-interval half-width
+    (`confidence_z` standard errors) falls below it. `callback(generation,
+    k, result)` is called after every generation. With a `checkpoint`, the
+    source bank and k history are saved between generations when due.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    total = scatter_prob + absorption_prob + fission_prob
+    scatter_cut = scatter_prob / total
+    absorb_cut = (scatter_prob + absorption_prob) / total
+
+    parameters = [num_neutrons, medium_size, mean_free_path, scatter_prob, absorption_prob,
+                  fission_prob, nu, inactive]
+
+    bank_x = np.empty(num_neutrons)
+    bank_y = np.empty(num_neutrons)
+    x = rng.uniform(0, medium_size, num_neutrons)
+    y = rng.uniform(0, medium_size, num_neutrons)
+    k_generations = np.empty(inactive + max_active)
+    ci_history = []
+    first = 0
+    if restart:
+        if checkpoint is None or not checkpoint.exists():
+            raise ValueError("Restart requested but there is no checkpoint file to resume from")
+        arrays, state = checkpoint.load()
+        check_parameters(state, parameters)
+        x, y = arrays["x"], arrays["y"]
+        first = state["next_generation"]
+        k_generations[:first] = arrays["k_generations"]
+        ci_history = list(arrays["ci_history"])
+        restore_rng(rng, state["rng"])
+    result = CriticalityResult(k_generations[:first], inactive, ci_history, confidence_z, False)
+
+    for generation in range(first, inactive + max_active):
+        if checkpoint is not None and generation > first and checkpoint.due():
+            checkpoint.save(
+                {"x": x, "y": y, "k_generations": k_generations[:generation],
+                 "ci_history": np.array(ci_history)},
+                {"parameters": parameters, "next_generation": generation, "rng": rng_state(rng)})
+        with stats.timer("criticality.generation"):
+            sites = _run_generation(x, y, medium_size, mean_free_path, scatter_cut, absorb_cut,
+                                    bank_x, bank_y, rng)
+        stats.count("criticality.source_neutrons", num_neutrons)
+        stats.count("criticality.fission_sites", sites)
+        k_generations[generation] = nu * sites / num_neutrons
+        result.k_generations = k_generations[:generation + 1]
+        if generation >= inactive:
+            ci_history.append(result.ci_half_width)
+        if callback is not None:
+            callback(generation, k_generations[generation], result)
+        if sites == 0:
+            break  # The chain reaction died out; nothing left to resample
+        if (tolerance is not None and len(result.active) >= min_active
+                and result.ci_half_width < tolerance):
+            result.converged = True
+            break
+
+        # Resample the fission source back to a constant population
+        pick = rng.integers(0, sites, num_neutrons)
+        x, y = bank_x[pick], bank_y[pick]
+
+    result.ci_history = np.array(ci_history)
+    return result
@@ -0,0 +1,268 @@
+"""Streaming Monte Carlo estimate of pi for Pi-Estimation-Montecarlo.py.
+
+Points are drawn uniformly in [-1, 1]^2 in fixed-size NumPy chunks and only
+the running counts are kept, so memory does not grow with the number of
+samples. A fixed-size reservoir sample (Vitter's algorithm R, applied a
+chunk at a time) keeps a uniform subset of all points drawn so far for
+plotting. `SamplingWorker` runs the sampling on a background thread and
+reports progress through a queue, so a GUI can stay responsive.
+"""
+import threading
+import time
+
+import numpy as np
+
+from instrumentation import stats
+
+CHUNK_SIZE = 1_000_000  # Points generated per NumPy call
+RESERVOIR_SIZE = 5_000  # Points kept for plotting
+SAMPLING_METHODS = ("pseudo", "antithetic", "stratified", "halton", "sobol")
+SOBOL_BITS = 32  # Sobol' points per randomisation: 2**SOBOL_BITS
+
+# Direction numbers of the second Sobol' coordinate (primitive polynomial x + 1):
+# m_j = 2 m_{j-1} XOR m_{j-1}, scaled to SOBOL_BITS-bit integers
+_SOBOL_M = [1]
+for _ in range(SOBOL_BITS - 1):
+    _SOBOL_M.append((_SOBOL_M[-1] << 1) ^ _SOBOL_M[-1])
+_SOBOL_DIRECTIONS = np.array([[1 << (SOBOL_BITS - 1 - j), m << (SOBOL_BITS - 1 - j)]
+                              for j, m in enumerate(_SOBOL_M)], dtype=np.uint64)
+
+
+def _radical_inverse(index, base):
+    """Van der Corput radical inverse of integer `index` in `base`."""
+    index = index.copy()
+    result = np.zeros(len(index))
+    scale = 1.0 / base
+    while index.any():
+        index, digit = np.divmod(index, base)
+        result += digit * scale
+        scale /= base
+    return result
+
+
+def halton(index):
+    """Points of the 2D Halton sequence (bases 2 and 3) at integer `index`."""
+    return np.column_stack([_radical_inverse(index, 2), _radical_inverse(index, 3)])
+
+
+def sobol(index, digital_shift=0):
+    """Points of the 2D Sobol' sequence at integer `index` (< 2**SOBOL_BITS).
+
+    `digital_shift` is XOR-ed into the SOBOL_BITS-bit coordinates.
+    """
+    index = index.astype(np.uint64)
+    bits = np.zeros((len(index), 2), dtype=np.uint64)
+    bits ^= np.asarray(digital_shift, dtype=np.uint64)
+    used = int(index.max()).bit_length() if len(index) else 0
+    for j, direction in enumerate(_SOBOL_DIRECTIONS[:used]):
+        bits ^= ((index >> np.uint64(j)) & np.uint64(1))[:, None] * direction
+    return bits / float(1 << SOBOL_BITS)
+
+
+class PiEstimator:
+    """Running estimate of pi = 4 * (points inside the unit circle) / (points).
+
+    `method` selects how points are drawn (all are unbiased):
+
+    * "pseudo": independent uniform points;
+    * "antithetic": pairs p, sign(p) * (1 - |p|), whose indicator values are
+      negatively correlated;
+    * "stratified": one jittered point per cell of the largest square grid
+      that fits in each chunk, the remainder uniform;
+    * "halton", "sobol": randomised quasi-random sequences (a random shift
+      modulo 1 for Halton, a random digital shift for Sobol'), continued
+      across chunks and re-randomised on `reset`.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE, reservoir_size=RESERVOIR_SIZE, rng=None,
+                 method="pseudo"):
+        if method not in SAMPLING_METHODS:
+            raise ValueError(f"Unknown sampling method {method!r}; "
+                             f"choose from {', '.join(SAMPLING_METHODS)}")
+        self.chunk_size = chunk_size
+        self.method = method
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.reservoir = np.empty((reservoir_size, 2))
+        self.reset()
+
+    def reset(self):
+        self.total = 0
+        self.inside = 0
+        self._shift = self.rng.random(2)
+        self._digital_shift = self.rng.integers(0, 1 << SOBOL_BITS, 2, dtype=np.uint64)
+
+    @property
+    def estimate(self):
+        return 4 * self.inside / self.total if self.total else float("nan")
+
+    @property
+    def std_error(self):
+        """One binomial standard error of `estimate`.
+
+        Exact for "pseudo"; the other methods have lower variance, so for
+        them it is an upper bound.
+        """
+        if not self.total:
+            return float("inf")
+        p = self.inside / self.total
+        return 4 * np.sqrt(p * (1 - p) / self.total)
+
+    @property
+    def sample_points(self):
+        """The reservoir: a uniform sample of at most `reservoir_size` points."""
+        return self.reservoir[:min(self.total, len(self.reservoir))]
+
+    def _keep(self, points):
+        """Offer a chunk of points to the reservoir."""
+        size = len(self.reservoir)
+        seen = self.total  # Points offered before this chunk
+        fill = min(max(size - seen, 0), len(points))
+        self.reservoir[seen:seen + fill] = points[:fill]
+        if fill == len(points):
+            return
+        # Point with global index i replaces slot j ~ U{0..i} if j < size;
+        # fancy assignment keeps the last write, matching the sequential order
+        index = np.arange(seen + fill, seen + len(points))
+        slot = (self.rng.random(len(index)) * (index + 1)).astype(np.int64)
+        hit = slot < size
+        self.reservoir[slot[hit]] = points[fill:][hit]
+
+    def _draw(self, count):
+        """`count` points in [0, 1)^2 from the selected method."""
+        if self.method == "pseudo":
+            return self.rng.random((count, 2))
+        if self.method == "antithetic":
+            # u -> (1/2 - u) mod 1 maps p = 2u - 1 to sign(p) * (1 - |p|)
+            half = self.rng.random(((count + 1) // 2, 2))
+            return np.concatenate([half, (0.5 - half) % 1.0])[:count]
+        if self.method == "stratified":
+            cells = int(np.sqrt(count))
+            row, col = np.divmod(np.arange(cells * cells), cells)
+            grid = (np.column_stack([row, col]) + self.rng.random((cells * cells, 2))) / cells
+            return np.concatenate([grid, self.rng.random((count - cells * cells, 2))])
+        index = np.arange(self.total, self.total + count)
+        if self.method == "halton":
+            points = halton(index)
+            points += self._shift
+            return points % 1.0
+        if self.total + count > 1 << SOBOL_BITS:
+            raise ValueError(f"The Sobol' sequence is limited to 2**{SOBOL_BITS} points")
+        return sobol(index, self._digital_shift)
+
+    def sample(self, num_points):
+        """Draw `num_points` more points, a chunk at a time."""
+        begin = time.perf_counter()
+        remaining = num_points
+        while remaining > 0:
+            count = min(self.chunk_size, remaining)
+            points = self._draw(count)
+            points *= 2
+            points -= 1
+            self.inside += int(np.count_nonzero(np.einsum("ij,ij->i", points, points) <= 1))
+            self._keep(points)
+            self.total += count
+            remaining -= count
+        stats.add_time("pi.sample", time.perf_counter() - begin)
+        stats.count("pi.samples", num_points)
+
+
+class Progress:
+    """Snapshot of a running estimate, as posted by `SamplingWorker`."""
+
+    def __init__(self, estimator, done, requested, samples_per_second, finished):
+        self.total = estimator.total
+        self.estimate = estimator.estimate
+        self.std_error = estimator.std_error
+        self.points = estimator.sample_points.copy()
+        self.done = done
+        self.requested = requested
+        self.samples_per_second = samples_per_second
+        self.finished = finished
+
+
+class SamplingWorker(threading.Thread):
+    """Draw `num_points` points into `estimator` on a background thread.
+
+    A `Progress` snapshot is put on the `progress` queue at most every
+    `report_every` seconds and once more at the end (with `finished` set).
+    `cancel` stops the run after the chunk in progress. The estimator must
+    not be touched by other threads until the worker has finished.
+    """
+
+    def __init__(self, estimator, num_points, progress, report_every=0.1):
+        super().__init__(daemon=True)
+        self.estimator = estimator
+        self.num_points = num_points
+        self.progress = progress
+        self.report_every = report_every
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def run(self):
+        begin = last_report = time.perf_counter()
+        done = 0
+        while done < self.num_points and not self.cancelled:
+            count = min(self.estimator.chunk_size, self.num_points - done)
+            self.estimator.sample(count)
+            done += count
+            now = time.perf_counter()
+            if now - last_report >= self.report_every:
+                self.progress.put(Progress(self.estimator, done, self.num_points,
+                                           done / (now - begin), False))
+                last_report = now
+        elapsed = time.perf_counter() - begin
+        rate = done / elapsed if elapsed else float("inf")
+        self.progress.put(Progress(self.estimator, done, self.num_points, rate, True))
+
+
+def variance_report(sizes=(10_000, 100_000, 1_000_000), methods=SAMPLING_METHODS, repeats=10,
+                    seed=42):
+    """RMS error and wall time of every method at every sample count.
+
+    Each (method, size) pair is run `repeats` times with independent seeds.
+    Returns one dict per pair.
+    """
+    rows = []
+    for method in methods:
+        for size in sizes:
+            errors = np.empty(repeats)
+            start = time.perf_counter()
+            for repeat in range(repeats):
+                estimator = PiEstimator(rng=np.random.default_rng((seed, repeat)), method=method)
+                estimator.sample(size)
+                errors[repeat] = estimator.estimate - np.pi
+            rows.append({
+                "method": method,
+                "samples": size,
+                "rms_error": float(np.sqrt(np.mean(errors ** 2))),
+                "seconds": (time.perf_counter() - start) / repeats,
+            })
+    return rows
+
+
+def cost_to_accuracy(rows, target):
+    """Samples and seconds each method needs for an RMS error of `target`.
+
+    Fits error = a * samples**b and seconds = c * samples**d per method on
+    the rows of `variance_report` and solves for the target, so values
+    outside the measured range are extrapolations.
+    """
+    costs = {}
+    for method in dict.fromkeys(row["method"] for row in rows):
+        mine = [row for row in rows if row["method"] == method]
+        log_n = np.log([row["samples"] for row in mine])
+        slope, intercept = np.polyfit(log_n, np.log([row["rms_error"] for row in mine]), 1)
+        samples = np.exp((np.log(target) - intercept) / slope)
+        time_slope, time_intercept = np.polyfit(log_n, np.log([row["seconds"] for row in mine]), 1)
+        costs[method] = {
+            "error_exponent": float(slope),
+            "samples": float(samples),
+            "seconds": float(np.exp(time_intercept + time_slope * np.log(samples))),
+        }
+    return costs
@@ -0,0 +1,118 @@
+"""Fast, size-bounded Plotly animations for the simulation scripts.
+
+Frames are built as plain dicts (no per-frame graph-object validation) from
+float32 arrays, which Plotly serialises as compact typed arrays. Long runs
+are decimated to at most `max_frames` frames, colours are computed for all
+kept frames in one vectorised pass, and growing paths are thinned to at most
+`max_points` points per frame, so the output size no longer grows with the
+number of simulation steps.
+"""
+import numpy as np
+
+MAX_FRAMES = 200  # Upper bound on animation frames written to the figure
+MAX_POINTS = 500  # Upper bound on points per growing path / line frame
+
+
+def frame_indices(num_steps, stride=1, max_frames=MAX_FRAMES):
+    """Indices of the steps to animate: every `stride`-th, capped at `max_frames`.
+
+    The final step is always kept so the animation ends on the last state.
+    """
+    if max_frames:
+        stride = max(stride, -(-num_steps // max_frames))
+    indices = np.arange(0, num_steps, stride)
+    if indices[-1] != num_steps - 1:
+        indices = np.append(indices[:max_frames - 1] if max_frames else indices, num_steps - 1)
+    return indices
+
+
+def _compact(values):
+    return np.ascontiguousarray(values, dtype=np.float32)
+
+
+def distance_colors(positions, indices):
+    """Distance from the origin of every star in every kept frame, as (F, N) float32."""
+    kept = np.asarray(positions[indices], dtype=np.float32)
+    return np.sqrt(np.einsum("fij,fij->fi", kept, kept))
+
+
+def scatter3d_trace(points, marker, name=None, mode="markers", **extra):
+    """A Scatter3d trace dict for an (N, 3) array of points."""
+    points = _compact(points)
+    trace = {"type": "scatter3d", "mode": mode, "x": points[:, 0], "y": points[:, 1],
+             "z": points[:, 2], "marker": marker, **extra}
+    if name is not None:
+        trace["name"] = name
+    return trace
+
+
+def scatter3d_frames(positions, indices, marker, colors=None, name=None):
+    """One frame per kept step, each holding a single Scatter3d of all points.
+
+    `colors` is an optional (F, N) array (see `distance_colors`) that is
+    sliced into each frame's marker instead of being recomputed.
+    """
+    frames = []
+    for k, i in enumerate(indices):
+        frame_marker = dict(marker)
+        if colors is not None:
+            frame_marker["color"] = colors[k]
+        frames.append({"name": str(i), "data": [scatter3d_trace(positions[i], frame_marker, name)]})
+    return frames
+
+
+def thin_prefix(values, end, max_points=MAX_POINTS):
+    """values[:end + 1] thinned to at most `max_points` rows, keeping the last one."""
+    stride = max(1, -(-(end + 1) // max_points))
+    keep = np.arange(0, end + 1, stride)
+    if keep[-1] != end:
+        keep = np.append(keep[:max_points - 1], end)
+    return values[keep], keep
+
+
+def play_pause_menu(duration):
+    """The Play/Pause button bar shared by every animation."""
+    return {
+        "buttons": [
+            {"args": [None, {"frame": {"duration": duration, "redraw": True}, "fromcurrent": True}],
+             "label": "Play", "method": "animate"},
+            {"args": [[None], {"frame": {"duration": 0, "redraw": True}, "mode": "immediate", "transition": {"duration": 0}}],
+             "label": "Pause", "method": "animate"}
+        ],
+        "direction": "left",
+        "pad": {"r": 10, "t": 87},
+        "showactive": False,
+        "type": "buttons",
+        "x": 0.1,
+        "xanchor": "right",
+        "y": 0,
+        "yanchor": "top"
+    }
+
+
+def animation_figure(data, frames, layout, duration=50):
+    """Assemble a figure dict with the Play/Pause controls added to `layout`."""
+    layout = dict(layout)
+    layout["updatemenus"] = [play_pause_menu(duration)]
+    return {"data": data, "layout": layout, "frames": frames}
+
+
+def write_animation(fig, path, auto_open=False):
+    """Write a standalone animation: HTML (plotly.js from CDN) or JSON by extension.
+
+    Arrays are written as binary typed arrays where the installed Plotly
+    supports it, and as plain JSON lists otherwise.
+    """
+    import plotly.io as pio
+
+    try:
+        # plotly >= 6 can base64-encode arrays into plotly.js typed-array specs
+        from _plotly_utils.utils import convert_to_base64
+    except ImportError:
+        pass
+    else:
+        convert_to_base64(fig)
+    if str(path).endswith(".json"):
+        pio.write_json(fig, path, validate=False)
+    else:
+        pio.write_html(fig, path, include_plotlyjs="cdn", validate=False, auto_open=auto_open)
@@ -1,71 +1,99 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
-from matplotlib.animation import FuncAnimation
-import random
+import sys
+
+from instrumentation import stats
+from lattice_chain import LatticeChain, metropolis_step_3d, run_chain
+from replica_exchange import geometric_ladder, run_replica_exchange
+from rng_streams import RandomBlock, spawn_rngs
 
 # Parameters
 CHAIN_LENGTH = 15  # Number of amino acids in the chain
 STEPS = 500        # Number of Monte Carlo steps
+SNAPSHOT_EVERY = 1  # Record the chain every k steps
+SNAPSHOT_FILE = "folding_3d_snapshots.npz"  # Recorded snapshots for replay
+HEADLESS = "--headless" in sys.argv  # Run without drawing anything
+REPLAY = "--replay" in sys.argv  # Animate SNAPSHOT_FILE instead of simulating
+TEMPERING = "--tempering" in sys.argv  # Report a parallel-tempering run instead
+NUM_REPLICAS = 8   # Replicas from T = 1 up to MAX_TEMPERATURE
+MAX_TEMPERATURE = 5.0  # Hottest replica of the ladder
+SWAP_EVERY = 10    # Monte Carlo steps between swap attempts
+SEED = 42          # Root seed; every chain / replica gets its own spawned stream
 
 # Initialize protein chain as a straight line in 3D space
-protein_chain = np.array([[i, 0, 0] for i in range(CHAIN_LENGTH)])  # Initial straight line
+protein_chain = LatticeChain([(i, 0, 0) for i in range(CHAIN_LENGTH)])  # Initial straight line
+
+# Energy: number of overlaps, tracked incrementally by LatticeChain
+
+# Pre-generated random numbers for the single-chain run (replicas spawn their own)
+RANDOM = RandomBlock(SEED)
+
+# Monte Carlo move in 3D: a random diagonal step of one monomer (see lattice_chain)
+def monte_carlo_step(chain, temperature=1.0, rng=None):
+    return metropolis_step_3d(chain, RANDOM if rng is None else rng, temperature)
 
-# Energy function: Penalize overlaps
-def calculate_energy(chain):
-    unique_positions = len(set(tuple(pos) for pos in chain))
-    return CHAIN_LENGTH - unique_positions  # Energy increases with overlaps
+# Replay recorded snapshots as an animation (optional; needs matplotlib and a display)
+def replay(snapshots, energies):
+    import matplotlib.pyplot as plt
+    from mpl_toolkits.mplot3d import Axes3D
+    from matplotlib.animation import FuncAnimation
 
-# Monte Carlo move in 3D
-def monte_carlo_step(chain):
-    # Select a random amino acid (not the first or last)
-    index = random.randint(1, len(chain) - 2)
-    
-    # Random move: Change position in a random 3D direction
-    move = np.random.choice([-1, 1], size=3)
-    new_position = chain[index] + move
+    # Visualization setup
+    fig = plt.figure(figsize=(8, 8))
+    ax = fig.add_subplot(111, projection='3d')
+    ax.set_xlim(0, CHAIN_LENGTH)
+    ax.set_ylim(-CHAIN_LENGTH // 2, CHAIN_LENGTH // 2)
+    ax.set_zlim(-CHAIN_LENGTH // 2, CHAIN_LENGTH // 2)
+    ax.set_xticks([])
+    ax.set_yticks([])
+    ax.set_zticks([])
 
-    # Create a new chain with the move
-    new_chain = chain.copy()
-    new_chain[index] = new_position
+    protein_plot, = ax.plot([], [], [], "bo-", lw=2)  # Protein chain
+    energy_text = ax.text2D(0.05, 0.95, "", transform=ax.transAxes, fontsize=12, va="top")
 
-    # Calculate energy difference
-    old_energy = calculate_energy(chain)
-    new_energy = calculate_energy(new_chain)
+    # Animation update function
+    def update(frame):
+        # Update protein chain plot
+        coords = snapshots[frame]
+        x_coords, y_coords, z_coords = coords[:, 0], coords[:, 1], coords[:, 2]
+        protein_plot.set_data(x_coords, y_coords)
+        protein_plot.set_3d_properties(z_coords)
+        
+        # Update energy text
+        energy_text.set_text(f"Energy: {energies[frame]}")
+        return protein_plot, energy_text
 
-    # Accept move with Metropolis criterion
-    if new_energy <= old_energy or random.random() < np.exp(-(new_energy - old_energy)):
-        return new_chain  # Accept move
-    return chain  # Reject move
+    # Run animation
+    ani = FuncAnimation(fig, update, frames=len(snapshots), blit=True, interval=50, repeat=False)
+    plt.title("3D Protein Folding Simulation")
+    plt.show()
 
-# Visualization setup
-fig = plt.figure(figsize=(8, 8))
-ax = fig.add_subplot(111, projection='3d')
-ax.set_xlim(0, CHAIN_LENGTH)
-ax.set_ylim(-CHAIN_LENGTH // 2, CHAIN_LENGTH // 2)
-ax.set_zlim(-CHAIN_LENGTH // 2, CHAIN_LENGTH // 2)
-ax.set_xticks([])
-ax.set_yticks([])
-ax.set_zticks([])
+if REPLAY:
+    recorded = np.load(SNAPSHOT_FILE)
+    replay(recorded["snapshots"], recorded["energies"])
+elif TEMPERING:
+    # Replicas on a temperature ladder, each advanced with monte_carlo_step at its own T
+    replicas = [LatticeChain([(i, 0, 0) for i in range(CHAIN_LENGTH)]) for _ in range(NUM_REPLICAS)]
 
-protein_plot, = ax.plot([], [], [], "bo-", lw=2)  # Protein chain
-energy_text = ax.text2D(0.05, 0.95, "", transform=ax.transAxes, fontsize=12, va="top")
+    # Independent streams: one per replica, one for the swap decisions
+    *replica_rngs, swap_rng = spawn_rngs(SEED, NUM_REPLICAS + 1)
+    replica_random = [RandomBlock(rng) for rng in replica_rngs]
 
-# Animation update function
-def update(frame):
-    global protein_chain
-    protein_chain = monte_carlo_step(protein_chain)
-    
-    # Update protein chain plot
-    x_coords, y_coords, z_coords = protein_chain[:, 0], protein_chain[:, 1], protein_chain[:, 2]
-    protein_plot.set_data(x_coords, y_coords)
-    protein_plot.set_3d_properties(z_coords)
-    
-    # Update energy text
-    energy_text.set_text(f"Energy: {calculate_energy(protein_chain)}")
-    return protein_plot, energy_text
+    def advance(chains, temperatures, steps):
+        for chain, temperature, rng in zip(chains, temperatures, replica_random):
+            for _ in range(steps):
+                monte_carlo_step(chain, temperature, rng)
 
-# Run animation
-ani = FuncAnimation(fig, update, frames=STEPS, blit=True, interval=50, repeat=False)
-plt.title("3D Protein Folding Simulation")
-plt.show()
+    tempering = run_replica_exchange(replicas, geometric_ladder(1.0, MAX_TEMPERATURE, NUM_REPLICAS),
+                                     advance, lambda chains: [chain.energy for chain in chains],
+                                     STEPS // SWAP_EVERY, SWAP_EVERY, rng=swap_rng)
+    stats.count("folding.move.proposed", NUM_REPLICAS * len(tempering.cold_energies) * SWAP_EVERY)
+    stats.count("folding.move.accepted", sum(chain.moves for chain in replicas))
+    print(tempering.summary())
+else:
+    # Run all steps at full speed, recording a snapshot every SNAPSHOT_EVERY steps
+    snapshots, energies = run_chain(protein_chain, monte_carlo_step, STEPS, SNAPSHOT_EVERY)
+    np.savez_compressed(SNAPSHOT_FILE, snapshots=snapshots, energies=energies)
+    if HEADLESS:
+        print(f"{STEPS} steps, final energy {energies[-1]}, snapshots saved to {SNAPSHOT_FILE}")
+    else:
+        replay(snapshots, energies)
@@ -0,0 +1,195 @@
+"""Receptor model for docking, with a precomputed energy grid.
+
+`Receptor` places `num_sites` interaction sites in a spherical shell
+around the receptor centre, leaving a mouth open towards the binding
+pocket. A ligand feels a softened Lennard-Jones term from every site on
+top of the script's funnel energy (its distance to the binding site).
+Evaluating the site term directly costs O(sites) per position. So
+`energy_grid` tabulates it once on a regular grid around the receptor and
+caches the table on disk. The file is keyed by a hash of the receptor and
+grid parameters. Each Metropolis step then costs one vectorised trilinear
+lookup (8 table reads per walker), whatever the number of sites.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from checkpoint import check_parameters, load_checkpoint, save_checkpoint
+from docking import calculate_energy
+from instrumentation import stats
+
+GRID_SPACING = 0.1  # Grid step, in the script's length units
+GRID_MARGIN = 2.0  # Grid extends this far beyond the outermost site
+GRID_CACHE = ".energy_grids"  # Directory of cached grids
+BLOCK_SIZE = 4096  # Positions per block when summing over all sites
+
+
+class Receptor:
+    """Interaction sites in a shell of radii `shell` around `center`.
+
+    Sites whose direction from the centre lies within `mouth_angle` degrees
+    of the binding site's direction are removed, so the ligand can reach
+    the pocket. Each site contributes 4 eps ((s/r)^12 - (s/r)^6), with
+    r^2 = d^2 + softening^2, so the energy stays finite inside a site.
+    The layout is fixed by `seed`.
+    """
+
+    def __init__(self, center, binding_site, num_sites=500, shell=(2.0, 3.0), mouth_angle=40.0,
+                 epsilon=0.2, sigma=0.6, softening=0.5, seed=0):
+        self.center = np.asarray(center, dtype=float)
+        self.binding_site = np.asarray(binding_site, dtype=float)
+        self.num_sites = num_sites
+        self.shell = tuple(float(radius) for radius in shell)
+        self.mouth_angle = float(mouth_angle)
+        self.epsilon = epsilon
+        self.sigma = sigma
+        self.softening = softening
+        self.seed = seed
+        self.sites = self._place_sites()
+
+    def _place_sites(self):
+        rng = np.random.default_rng(self.seed)
+        axis = self.binding_site - self.center
+        norm = np.linalg.norm(axis)
+        cos_mouth = np.cos(np.radians(self.mouth_angle))
+        sites = np.empty((0, 3))
+        while len(sites) < self.num_sites:
+            directions = rng.normal(size=(self.num_sites, 3))
+            directions /= np.linalg.norm(directions, axis=1)[:, None]
+            if norm > 0:
+                directions = directions[directions @ axis / norm < cos_mouth]
+            inner, outer = self.shell
+            radii = np.cbrt(rng.uniform(inner ** 3, outer ** 3, len(directions)))  # Uniform in volume
+            sites = np.concatenate([sites, self.center + directions * radii[:, None]])
+        return sites[:self.num_sites]
+
+    def parameters(self):
+        """Everything the site layout and energy depend on (the grid cache key)."""
+        return {
+            "center": self.center.tolist(),
+            "binding_site": self.binding_site.tolist(),
+            "num_sites": self.num_sites,
+            "shell": list(self.shell),
+            "mouth_angle": self.mouth_angle,
+            "epsilon": self.epsilon,
+            "sigma": self.sigma,
+            "softening": self.softening,
+            "seed": self.seed,
+        }
+
+    def site_energy(self, positions, block_size=BLOCK_SIZE):
+        """Exact sum of the site terms for a (..., 3) array of positions."""
+        positions = np.asarray(positions, dtype=float)
+        flat = positions.reshape(-1, 3) - self.center  # Centred, for accurate squared distances
+        sites = self.sites - self.center
+        site_norms = np.einsum("ij,ij->i", sites, sites) + self.softening ** 2
+        energy = np.empty(len(flat))
+        for start in range(0, len(flat), block_size):
+            block = flat[start:start + block_size]
+            # |p - s|^2 + softening^2 via one matrix product
+            r2 = block @ (-2 * sites.T)
+            r2 += site_norms
+            r2 += np.einsum("ij,ij->i", block, block)[:, None]
+            np.maximum(r2, self.softening ** 2, out=r2)
+            s2 = np.reciprocal(r2, out=r2)
+            s2 *= self.sigma ** 2
+            s6 = s2 * s2
+            s6 *= s2
+            energy[start:start + block_size] = 4 * self.epsilon * (s6 * (s6 - 1)).sum(axis=1)
+        return energy.reshape(positions.shape[:-1])
+
+    def energy(self, positions):
+        """Exact docking energy: distance to the binding site plus the site terms."""
+        return calculate_energy(positions, self.binding_site) + self.site_energy(positions)
+
+
+class EnergyGrid:
+    """A scalar field tabulated on a regular grid, read by trilinear interpolation.
+
+    `values[i, j, k]` is the field at `lower + spacing * (i, j, k)`.
+    Positions outside the grid read as 0, so the grid should extend to
+    where the field has decayed.
+    """
+
+    def __init__(self, lower, spacing, values):
+        self.lower = np.asarray(lower, dtype=float)
+        self.spacing = float(spacing)
+        self.values = np.ascontiguousarray(values, dtype=float)
+        self.shape = np.array(self.values.shape)
+        self._flat = self.values.ravel()
+        self._strides = np.array([self.values.shape[1] * self.values.shape[2],
+                                  self.values.shape[2], 1])
+
+    @property
+    def upper(self):
+        return self.lower + self.spacing * (self.shape - 1)
+
+    def __call__(self, positions):
+        """Interpolated field at a (..., 3) array of positions."""
+        positions = np.asarray(positions, dtype=float)
+        scaled = (positions - self.lower) / self.spacing
+        inside = np.all((scaled >= 0) & (scaled <= self.shape - 1), axis=-1)
+        cell = np.clip(np.floor(scaled).astype(np.intp), 0, self.shape - 2)
+        t = np.clip(scaled - cell, 0.0, 1.0)
+        base = cell @ self._strides
+        tx, ty, tz = t[..., 0], t[..., 1], t[..., 2]
+        sx, sy, sz = self._strides
+        v = self._flat
+        # Interpolate along z, then y, then x
+        c00 = v[base] + tz * (v[base + 1] - v[base])
+        c01 = v[base + sy] + tz * (v[base + sy + 1] - v[base + sy])
+        c10 = v[base + sx] + tz * (v[base + sx + 1] - v[base + sx])
+        c11 = v[base + sx + sy] + tz * (v[base + sx + sy + 1] - v[base + sx + sy])
+        c0 = c00 + ty * (c01 - c00)
+        c1 = c10 + ty * (c11 - c10)
+        return np.where(inside, c0 + tx * (c1 - c0), 0.0)
+
+
+def build_energy_grid(receptor, spacing=GRID_SPACING, margin=GRID_MARGIN):
+    """Tabulate `receptor.site_energy` on a cube covering its shell plus `margin`."""
+    half = receptor.shell[1] + margin
+    count = int(np.ceil(2 * half / spacing)) + 1
+    lower = receptor.center - half
+    axis = np.arange(count) * spacing
+    points = lower + np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1)
+    with stats.timer("docking.grid.build"):
+        values = receptor.site_energy(points)
+    return EnergyGrid(lower, spacing, values)
+
+
+def grid_key(receptor, spacing=GRID_SPACING, margin=GRID_MARGIN):
+    """Content hash naming the cached grid of `receptor`."""
+    parameters = dict(receptor.parameters(), spacing=spacing, margin=margin)
+    return hashlib.sha256(json.dumps(parameters, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def energy_grid(receptor, spacing=GRID_SPACING, margin=GRID_MARGIN, cache_dir=GRID_CACHE):
+    """The energy grid of `receptor`, loaded from `cache_dir` or built and saved there.
+
+    With `cache_dir=None` the grid is always rebuilt and never written.
+    """
+    if cache_dir is None:
+        return build_energy_grid(receptor, spacing, margin)
+    parameters = dict(receptor.parameters(), spacing=spacing, margin=margin)
+    path = os.path.join(cache_dir, f"grid-{grid_key(receptor, spacing, margin)}.npz")
+    if os.path.exists(path):
+        arrays, state = load_checkpoint(path)
+        check_parameters(state, parameters)
+        stats.count("docking.grid.cache_hit")
+        return EnergyGrid(arrays["lower"], state["spacing"], arrays["values"])
+    grid = build_energy_grid(receptor, spacing, margin)
+    os.makedirs(cache_dir, exist_ok=True)
+    save_checkpoint(path, {"lower": grid.lower, "values": grid.values},
+                    {"parameters": parameters, "spacing": spacing})
+    return grid
+
+
+def grid_energy(receptor, grid):
+    """Docking energy function of (..., 3) positions using `grid` for the site terms."""
+    binding_site = receptor.binding_site
+
+    def energy(positions):
+        return calculate_energy(positions, binding_site) + grid(positions)
+    return energy
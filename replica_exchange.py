@@ -0,0 +1,124 @@
+"""Parallel tempering (replica exchange) for the Metropolis samplers.
+
+R replicas run at the temperatures of a ladder. After every round of
+`steps_per_round` Metropolis steps, neighbouring temperature slots try to
+exchange their replicas with probability
+
+    min(1, exp((1/T_k - 1/T_{k+1}) * (E_k - E_{k+1})))
+
+alternating between even and odd pairs. Swaps exchange temperatures rather
+than configurations, so no sampler state is ever copied. The driver is
+generic: the caller supplies `advance(state, temperatures, steps)`, which
+moves every replica at its own temperature, and `energies(state)`.
+"""
+import time
+
+import numpy as np
+
+from instrumentation import stats
+
+
+def geometric_ladder(t_min, t_max, count):
+    """`count` temperatures spaced geometrically from t_min to t_max."""
+    if count == 1:
+        return np.array([float(t_min)])
+    return t_min * (t_max / t_min) ** (np.arange(count) / (count - 1))
+
+
+def integrated_autocorrelation_time(series, window=5.0):
+    """Integrated autocorrelation time of a 1D series (FFT, Sokal's window)."""
+    x = np.asarray(series, dtype=float)
+    x = x - x.mean()
+    n = len(x)
+    if n < 2 or not x.any():
+        return 1.0
+    size = 1 << (2 * n - 1).bit_length()
+    spectrum = np.fft.rfft(x, size)
+    acf = np.fft.irfft(spectrum * np.conj(spectrum), size)[:n]
+    acf /= acf[0]
+    tau = 2 * np.cumsum(acf) - 1
+    cutoff = np.arange(n) >= window * tau
+    m = np.argmax(cutoff) if cutoff.any() else n - 1
+    return max(float(tau[m]), 1.0)
+
+
+class ReplicaExchangeResult:
+    """Outcome of `run_replica_exchange`.
+
+    `replica_at[k]` is the replica currently at temperature slot k (slot 0 is
+    the coldest), `swap_rates[k]` the acceptance rate of swaps between slots
+    k and k+1, and `cold_energies` the energy at slot 0 after every round.
+    """
+
+    def __init__(self, temperatures, replica_at, swap_attempts, swap_accepts, cold_energies,
+                 seconds):
+        self.temperatures = temperatures
+        self.replica_at = replica_at
+        self.swap_attempts = swap_attempts
+        self.swap_accepts = swap_accepts
+        self.cold_energies = cold_energies
+        self.seconds = seconds
+
+    @property
+    def swap_rates(self):
+        return self.swap_accepts / np.maximum(self.swap_attempts, 1)
+
+    @property
+    def effective_samples(self):
+        """Cold-slot samples divided by their integrated autocorrelation time."""
+        return len(self.cold_energies) / integrated_autocorrelation_time(self.cold_energies)
+
+    @property
+    def effective_samples_per_second(self):
+        return self.effective_samples / self.seconds if self.seconds else float("inf")
+
+    def summary(self):
+        rates = ", ".join(f"{rate:.0%}" for rate in self.swap_rates)
+        return (f"{len(self.temperatures)} replicas, T {self.temperatures[0]:.3g}..{self.temperatures[-1]:.3g}: "
+                f"swap rates [{rates}], mean cold energy {np.mean(self.cold_energies):.3f}, "
+                f"{self.effective_samples:.0f} effective samples "
+                f"({self.effective_samples_per_second:.0f}/s)")
+
+
+def run_replica_exchange(state, temperatures, advance, energies, num_rounds, steps_per_round=10,
+                         rng=None):
+    """Run `num_rounds` rounds of local moves followed by neighbour swaps.
+
+    `advance(state, replica_temperatures, steps)` must advance replica r at
+    `replica_temperatures[r]`; `energies(state)` returns the (R,) energies.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    temperatures = np.asarray(temperatures, dtype=float)
+    count = len(temperatures)
+    beta = 1.0 / temperatures
+    replica_at = np.arange(count)  # Slot -> replica
+    slot_of = np.arange(count)  # Replica -> slot
+    swap_attempts = np.zeros(max(count - 1, 0), dtype=np.int64)
+    swap_accepts = np.zeros_like(swap_attempts)
+    cold_energies = np.empty(num_rounds)
+
+    begin = time.perf_counter()
+    for round_index in range(num_rounds):
+        with stats.timer("replica_exchange.advance"):
+            advance(state, temperatures[slot_of], steps_per_round)
+        energy = np.asarray(energies(state), dtype=float)
+
+        # Even rounds try pairs (0,1), (2,3), ...; odd rounds (1,2), (3,4), ...
+        lower = np.arange(round_index % 2, count - 1, 2)
+        if len(lower):
+            upper = lower + 1
+            e_lower, e_upper = energy[replica_at[lower]], energy[replica_at[upper]]
+            log_ratio = (beta[lower] - beta[upper]) * (e_lower - e_upper)
+            accept = np.log(rng.random(len(lower))) < np.minimum(log_ratio, 0)
+            swap_attempts[lower] += 1
+            swap_accepts[lower] += accept
+            a, b = lower[accept], upper[accept]
+            replica_at[a], replica_at[b] = replica_at[b], replica_at[a]
+            slot_of[replica_at] = np.arange(count)
+        cold_energies[round_index] = energy[replica_at[0]]
+    seconds = time.perf_counter() - begin
+    stats.count("replica_exchange.swap.proposed", int(swap_attempts.sum()))
+    stats.count("replica_exchange.swap.accepted", int(swap_accepts.sum()))
+
+    return ReplicaExchangeResult(temperatures, replica_at, swap_attempts, swap_accepts,
+                                 cold_energies, seconds)
@@ -0,0 +1,67 @@
+"""Reproducible random streams shared by the simulations.
+
+Every simulation draws from `np.random.Generator` objects derived from one
+root seed. Independent streams for workers, walkers or replicas come from
+`SeedSequence.spawn`, so each stream depends only on the root seed and its
+index, never on scheduling or on how many other streams exist, and no two
+streams are correlated. Scalar hot loops use `RandomBlock`, which serves
+draws from blocks generated in bulk instead of paying for one generator
+call per number.
+"""
+import itertools
+
+import numpy as np
+
+BLOCK_SIZE = 65_536  # Numbers generated per refill of a RandomBlock
+
+
+def seed_sequence(seed=None):
+    """A `np.random.SeedSequence` for `seed` (an int, None or a SeedSequence)."""
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed)
+
+
+def make_rng(seed=None):
+    """A Generator for `seed`; an existing Generator is returned unchanged."""
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.Generator(np.random.PCG64(seed_sequence(seed)))
+
+
+def spawn_seeds(seed, count):
+    """`count` independent child SeedSequences (picklable, for worker processes)."""
+    return seed_sequence(seed).spawn(count)
+
+
+def spawn_rngs(seed, count):
+    """`count` independent Generators, one per worker, walker or replica."""
+    return [make_rng(child) for child in spawn_seeds(seed, count)]
+
+
+class RandomBlock:
+    """Scalar random draws served from pre-generated blocks.
+
+    Uniform numbers are generated `block_size` at a time into a Python
+    list, so each scalar draw is a step of a list iterator rather than a
+    generator call. `random()` returns a float uniform in [0, 1); the other
+    methods mirror the parts of the `random` module the scripts used.
+    """
+
+    def __init__(self, rng=None, block_size=BLOCK_SIZE):
+        self.rng = make_rng(rng)
+        self.block_size = block_size
+        # An endless iterator over the blocks; `random` is its C-level __next__
+        blocks = iter(lambda: self.rng.random(self.block_size).tolist(), None)
+        self.random = itertools.chain.from_iterable(blocks).__next__
+
+    def integers(self, low, high):
+        """An int uniform in [low, high)."""
+        return low + int(self.random() * (high - low))
+
+    def randint(self, low, high):
+        """An int uniform in [low, high], like `random.randint`."""
+        return low + int(self.random() * (high - low + 1))
+
+    def choice(self, options):
+        return options[int(self.random() * len(options))]
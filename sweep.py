@@ -0,0 +1,434 @@
+"""Parameter sweeps over the simulations, on a local process pool.
+
+A sweep expands a grid of parameter values for one simulation, times a
+number of replicate seeds, into independent runs:
+
+    python -m sweep transport --grid scatter_prob=0.4,0.5,0.6 num_neutrons=1e5,1e6 --seeds 4
+    python -m sweep galaxy --grid num_particles=200,400 integrator=euler,leapfrog --workers 4
+    python -m sweep docking --grid start=[0,0,0],[2,2,2] temperature=0.5,1
+
+Runs are submitted longest first (by each simulation's cost estimate), so
+the big jobs do not end up alone at the tail of the sweep. Replicate i
+uses the i-th child of `--seed` (`rng_streams.spawn_seeds`), so its stream
+depends only on the root seed and i. Every result is stored in `--cache`
+under a hash of the simulation, its full parameters and the replicate's
+seed. Repeated or overlapping sweeps therefore only run the points they
+have not seen.
+"""
+import argparse
+import ast
+import csv
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from rng_streams import make_rng, spawn_seeds
+
+CACHE_DIR = ".sweep_cache"  # Directory of cached run results
+SEED = 42
+
+
+def _galaxy(params, seed):
+    from galaxy.simulation import GalaxyConfig, simulate
+
+    with tempfile.TemporaryDirectory() as directory:
+        config = GalaxyConfig(**params, seed=int(seed.generate_state(1)[0]),
+                              trajectory_file=os.path.join(directory, "trajectory.npy"))
+        result = simulate(config)
+        del result.trajectory  # Release the memory map before the file is removed
+    return {"energy_drift": result.energy_drift, "force_evaluations": result.force_evaluations,
+            "seconds": result.seconds}
+
+
+def _galaxy_cost(params):
+    n = params["num_particles"]
+    pairs = n * np.log2(n) if params["backend"] == "barnes-hut" else n * n
+    return pairs * params["num_steps"]
+
+
+def _transport(params, seed):
+    from neutron_transport import transport
+
+    result = transport(**params, rng=make_rng(seed))
+    return {"absorbed": result.absorbed, "fissions": result.fissions, "leaked": result.leaked,
+            "collisions": result.collisions, "histories": result.histories}
+
+
+def _transport_cost(params):
+    total = params["scatter_prob"] + params["absorption_prob"] + params["fission_prob"]
+    return params["num_neutrons"] / max(1 - params["scatter_prob"] / total, 1e-3)
+
+
+def _criticality(params, seed):
+    from neutron_transport import criticality
+
+    result = criticality(**params, rng=make_rng(seed))
+    return {"k_mean": result.k_mean, "ci_half_width": result.ci_half_width,
+            "generations": len(result.k_generations), "converged": result.converged}
+
+
+def _criticality_cost(params):
+    return params["num_neutrons"] * (params["inactive"] + params["max_active"])
+
+
+def _docking(params, seed):
+    from docking import run_docking
+
+    params = dict(params)
+    start, binding_site = np.array(params.pop("start")), np.array(params.pop("binding_site"))
+    result = run_docking(params.pop("num_walkers"), params.pop("num_steps"), start, binding_site,
+                         **params, rng=make_rng(seed))
+    bound = result.binding_steps[result.binding_steps >= 0]
+    return {"bound_fraction": result.bound_fraction,
+            "mean_binding_step": float(bound.mean()) if len(bound) else None,
+            "acceptance": float(result.acceptance_rates.mean()), "seconds": result.seconds}
+
+
+def _docking_cost(params):
+    return params["num_walkers"] * params["num_steps"]
+
+
+def _pi(params, seed):
+    from pi_estimation import PiEstimator
+
+    estimator = PiEstimator(rng=make_rng(seed), method=params["method"])
+    estimator.sample(params["num_samples"])
+    return {"estimate": estimator.estimate, "error": estimator.estimate - np.pi,
+            "std_error": estimator.std_error}
+
+
+def _pi_cost(params):
+    return params["num_samples"]
+
+
+def _haber(params, seed):
+    from math import comb
+
+    from haber_kinetics import simulate_ssa, simulate_tau_leap, summarize
+
+    initial = (params["num_N2"], params["num_H2"], params["num_NH3"])
+    k_forward = params["reaction_rate"] / (params["num_N2"] * comb(params["num_H2"], 3))
+    steps = params["time_steps"]
+    arguments = (initial, k_forward, params["reverse_rate_constant"], steps, steps + 1,
+                 params["num_trajectories"])
+    if params["method"] == "ssa":
+        _, counts = simulate_ssa(*arguments, make_rng(seed))
+    else:
+        _, counts = simulate_tau_leap(*arguments, params["leaps_per_step"], make_rng(seed))
+    mean_counts, quantile_counts = summarize(counts, quantiles=(0.05, 0.95))
+    return {"final_N2": mean_counts[-1, 0], "final_H2": mean_counts[-1, 1],
+            "final_NH3": mean_counts[-1, 2], "final_NH3_q05": quantile_counts[0, -1, 2],
+            "final_NH3_q95": quantile_counts[1, -1, 2]}
+
+
+def _haber_cost(params):
+    return params["num_trajectories"] * params["time_steps"]
+
+
+def _folding(params, seed):
+    from lattice_chain import LatticeChain, metropolis_step_2d, metropolis_step_3d, run_chain
+    from rng_streams import RandomBlock
+
+    length, grid_size = params["chain_length"], params["grid_size"]
+    if params["dimensions"] == 2:
+        chain = LatticeChain([(i, grid_size // 2) for i in range(length)], grid_size=grid_size)
+        move = metropolis_step_2d
+    else:
+        chain = LatticeChain([(i, 0, 0) for i in range(length)])
+        move = metropolis_step_3d
+    rng, temperature, steps = RandomBlock(make_rng(seed)), params["temperature"], params["steps"]
+    every = max(1, steps // 1000)  # Keep about 1000 energy samples per run
+    _, energies = run_chain(chain, lambda chain: move(chain, rng, temperature), steps, every)
+    return {"final_energy": int(chain.energy), "min_energy": int(energies.min()),
+            "mean_energy": float(energies.mean()), "acceptance": chain.moves / max(steps, 1)}
+
+
+def _folding_cost(params):
+    return params["steps"]
+
+
+# name -> (run(params, seed) returning a dict of metrics, default parameters, cost(params))
+SIMULATIONS = {
+    "galaxy": (_galaxy, {"num_particles": 200, "G": 1, "time_step": 0.01, "num_steps": 500,
+                         "softening": 0.1, "backend": "direct", "theta": 0.5,
+                         "integrator": "euler", "precision": "double"}, _galaxy_cost),
+    "transport": (_transport, {"num_neutrons": 1000, "medium_size": 10, "mean_free_path": 1.0,
+                               "scatter_prob": 0.6, "absorption_prob": 0.3,
+                               "fission_prob": 0.1}, _transport_cost),
+    "criticality": (_criticality, {"num_neutrons": 10000, "medium_size": 10,
+                                   "mean_free_path": 1.0, "scatter_prob": 0.6,
+                                   "absorption_prob": 0.3, "fission_prob": 0.1, "nu": 2.0,
+                                   "inactive": 10, "max_active": 200,
+                                   "tolerance": 0.002}, _criticality_cost),
+    "docking": (_docking, {"num_walkers": 1000, "num_steps": 100, "start": [0, 0, 0],
+                           "binding_site": [5, 6, 5], "temperature": 1.0,
+                           "binding_radius": 1.5, "step_size": 1.0}, _docking_cost),
+    "pi": (_pi, {"num_samples": 1_000_000, "method": "pseudo"}, _pi_cost),
+    "haber": (_haber, {"num_N2": 50, "num_H2": 150, "num_NH3": 0, "reaction_rate": 0.05,
+                       "reverse_rate_constant": 1e-4, "time_steps": 200,
+                       "num_trajectories": 1000, "method": "ssa", "leaps_per_step": 1},
+              _haber_cost),
+    "folding": (_folding, {"dimensions": 2, "chain_length": 20, "grid_size": 20, "steps": 1000,
+                           "temperature": 1.0}, _folding_cost),
+}
+
+
+def _simulation(name):
+    if name not in SIMULATIONS:
+        raise ValueError(f"Unknown simulation {name!r}; choose from {', '.join(SIMULATIONS)}")
+    return SIMULATIONS[name]
+
+
+def _choices(simulation):
+    """Allowed values of the parameters of `simulation` that name a method."""
+    if simulation == "galaxy":
+        from galaxy.backends import FORCE_BACKENDS
+        from galaxy.integrators import INTEGRATORS
+        from galaxy.simulation import PRECISIONS
+
+        return {"backend": FORCE_BACKENDS, "integrator": INTEGRATORS,
+                "precision": tuple(PRECISIONS)}
+    if simulation == "pi":
+        from pi_estimation import SAMPLING_METHODS
+
+        return {"method": SAMPLING_METHODS}
+    if simulation == "haber":
+        return {"method": ("ssa", "tau-leap")}
+    if simulation == "folding":
+        return {"dimensions": (2, 3)}
+    return {}
+
+
+def _check_point(simulation, params):
+    """Raise ValueError if `simulation` does not support this combination of parameters."""
+    if simulation == "galaxy":
+        from galaxy.backends import check_force_backend
+        from galaxy.simulation import PRECISIONS
+
+        check_force_backend(params["backend"], dtype=PRECISIONS[params["precision"]][0])
+
+
+def _split_values(text):
+    """Split `text` on the commas outside brackets, so `[1,1,1],[2,2,2]` is two values."""
+    values, depth, start = [], 0, 0
+    for index, char in enumerate(text):
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        elif char == "," and depth == 0:
+            values.append(text[start:index])
+            start = index + 1
+    values.append(text[start:])
+    return values
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _typed(value, default):
+    """`value` converted to the type of `default`, or None if it does not fit."""
+    if isinstance(default, list):
+        if (isinstance(value, (list, tuple)) and len(value) == len(default)
+                and all(_is_number(item) for item in value)):
+            return list(value)
+    elif isinstance(default, float):
+        if _is_number(value):
+            return float(value)
+    elif isinstance(default, int):
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    elif isinstance(value, type(default)):
+        return value
+    return None
+
+
+def parse_grid(simulation, assignments):
+    """`["name=v1,v2", ...]` as {name: [values]}, typed like the defaults.
+
+    Values are Python literals and a bare word is a string; commas inside
+    brackets do not split values, so `start=[0,0,0],[1,1,1]` is two points.
+    Numbers take the type of the default, so `num_neutrons=1e6` is an int
+    and `temperature=1` a float (and both hash like the defaults). A value
+    that does not fit its default, or is not one of a method parameter's
+    choices, raises ValueError here rather than failing inside a worker,
+    and so does a grid point combining values the simulation does not
+    support together (such as precision=mixed with backend=barnes-hut).
+    """
+    defaults = _simulation(simulation)[1]
+    choices = _choices(simulation)
+    grid = {}
+    for assignment in assignments:
+        name, _, text = assignment.partition("=")
+        if name not in defaults:
+            raise ValueError(f"Unknown parameter {name!r} of {simulation}; "
+                             f"choose from {', '.join(defaults)}")
+        default = defaults[name]
+        values = []
+        for item in _split_values(text):
+            try:
+                value = ast.literal_eval(item)
+            except (ValueError, SyntaxError):
+                value = item
+            typed = _typed(value, default)
+            if typed is None:
+                raise ValueError(f"Bad value {item!r} for {name} of {simulation}; "
+                                 f"expected a value like the default {default!r}")
+            if name in choices and typed not in choices[name]:
+                raise ValueError(f"Unknown {name} {typed!r} of {simulation}; "
+                                 f"choose from {', '.join(map(str, choices[name]))}")
+            values.append(typed)
+        grid[name] = values
+    for values in itertools.product(*grid.values()):
+        _check_point(simulation, dict(defaults, **dict(zip(grid, values))))
+    return grid
+
+
+def expand(simulation, grid, seeds=1, root_seed=SEED):
+    """Every run of the sweep, as (parameters, replicate, seed) in grid order."""
+    defaults = _simulation(simulation)[1]
+    children = spawn_seeds(root_seed, seeds)
+    runs = []
+    for values in itertools.product(*grid.values()):
+        params = dict(defaults, **dict(zip(grid, values)))
+        for replicate, seed in enumerate(children):
+            runs.append((params, replicate, seed))
+    return runs
+
+
+def run_key(simulation, params, seed):
+    """Content hash of one run: simulation, full parameters and seed."""
+    identity = {"simulation": simulation, "parameters": params,
+                "seed": [seed.entropy, list(seed.spawn_key)]}
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Run results as JSON files named by `run_key`, written atomically."""
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, record):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as handle:
+            json.dump(record, handle)
+        os.replace(temporary, path)
+
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _execute(simulation, params, seed):
+    """Worker entry point: run one point and time it."""
+    start = time.perf_counter()
+    metrics = _simulation(simulation)[0](params, seed)
+    return {name: _to_json(value) for name, value in metrics.items()}, time.perf_counter() - start
+
+
+def run_sweep(simulation, grid, seeds=1, root_seed=SEED, workers=None, cache_dir=CACHE_DIR,
+              progress=None):
+    """Run every point of the sweep that is not cached; return one row per run.
+
+    Rows come back in grid order and hold the swept parameters, the
+    replicate index, the metrics, the run's wall time and whether it came
+    from the cache. `progress(done, total)` is called as runs finish.
+    """
+    cost = _simulation(simulation)[2]
+    cache = ResultCache(cache_dir) if cache_dir is not None else None
+    runs = expand(simulation, grid, seeds, root_seed)
+    keys = [run_key(simulation, params, seed) for params, _, seed in runs]
+    records = [cache.get(key) if cache is not None else None for key in keys]
+    pending = sorted((i for i, record in enumerate(records) if record is None),
+                     key=lambda i: cost(runs[i][0]), reverse=True)  # Longest first
+
+    done = len(runs) - len(pending)
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_execute, simulation, runs[i][0], runs[i][2]): i
+                       for i in pending}
+            for future in as_completed(futures):
+                i = futures[future]
+                metrics, seconds = future.result()
+                records[i] = {"metrics": metrics, "seconds": seconds}
+                if cache is not None:
+                    cache.put(keys[i], records[i])
+                done += 1
+                if progress is not None:
+                    progress(done, len(runs))
+
+    cached = set(range(len(runs))) - set(pending)
+    return [dict({name: params[name] for name in grid}, replicate=replicate,
+                 **records[i]["metrics"], run_seconds=records[i]["seconds"], cached=i in cached)
+            for i, (params, replicate, _) in enumerate(runs)]
+
+
+def write_rows(rows, path):
+    """Write sweep rows as CSV (for .csv) or JSON."""
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(dict.fromkeys(
+                name for row in rows for name in row)))
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, "w") as handle:
+            json.dump(rows, handle, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m sweep", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("simulation", choices=list(SIMULATIONS))
+    parser.add_argument("--grid", nargs="*", default=[], metavar="NAME=V1,V2",
+                        help="parameter values to sweep (the rest keep their defaults)")
+    parser.add_argument("--seeds", type=int, default=1, help="replicates per grid point")
+    parser.add_argument("--seed", type=int, default=SEED, help="root seed of the replicates")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--cache", default=CACHE_DIR, help="result cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="neither read nor write the cache")
+    parser.add_argument("--output", default="sweep_results.json", help=".json or .csv")
+    args = parser.parse_args(argv)
+
+    try:
+        grid = parse_grid(args.simulation, args.grid)
+    except ValueError as error:
+        parser.error(str(error))
+    start = time.perf_counter()
+    rows = run_sweep(args.simulation, grid, args.seeds, args.seed, args.workers,
+                     None if args.no_cache else args.cache,
+                     progress=lambda done, total: print(f"\r{done}/{total} runs", end="",
+                                                        flush=True))
+    cached = sum(row["cached"] for row in rows)
+    print(f"\r{len(rows)} runs ({cached} from cache) in {time.perf_counter() - start:.1f}s")
+    write_rows(rows, args.output)
+    print(f"Results written to {args.output}")
+    return rows
+
+
+if __name__ == "__main__":
+    main()